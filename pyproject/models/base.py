@@ -1,19 +1,258 @@
 import collections
+import collections.abc
 import copy
 import itertools
+import json
 import re
+import sys
+import types
 
 from . import errors
 from . import utils
 
 
+# Compiled view of every `[_*]_attributes` section over a class's MRO.
+#   sections: `_<section>_attributes` -> tuple of names (or pairs).
+#   names: `_attrs(section)` as frozensets, for membership tests.
+#   attributes: ordered `(name, default)` pairs, last default wins.
+#   caches: `_<cached>_cache` keys, for each name in `_cached_attributes`.
+#   invalidates: attribute -> caches derived from `_<cached>_attributes`.
+#   pseudo: attributes behind a setter with side effects, eg. url.
+#   init: initializer specialized for the class; see _compile_init().
+Plan = collections.namedtuple('Plan', ('sections', 'names', 'attributes',
+                                       'defaults', 'compact', 'key',
+                                       'simple_key', 'caches', 'invalidates',
+                                       'pseudo', 'init'))
+
+
+class Registry(dict):
+    """Registered model classes, keyed by `(model, type)`.
+
+    resolve() remembers the outcome of every `(cls, model, type)` it sees,
+    including wildcard fallbacks, so resolving again costs a single dict hit.
+    Bad casts are remembered too, by message only and only the latest
+    `maxfailed` of them, since their keys often come straight from configs.
+    Registering a class only forgets outcomes for its model.
+    """
+
+    maxfailed = 1024
+
+    def __init__(self, *args, **kwds):
+        super().__init__(*args, **kwds)
+        # {(cls, model, type): regcls}, {(cls, model, type): (model, CastError
+        # args)}, oldest first, and keys per model.
+        self.resolved = {}
+        self.failed = collections.OrderedDict()
+        self.models = {}
+
+    def __setitem__(self, key, cls):
+        super().__setitem__(key, cls)
+        self.forget(key[0])
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.forget(key[0])
+
+    def update(self, *args, **kwds):
+        for key, cls in dict(*args, **kwds).items():
+            self[key] = cls
+
+    def clear(self):
+        super().clear()
+        self.resolved.clear()
+        self.failed.clear()
+        self.models.clear()
+
+    def forget(self, model):
+        for key in self.models.pop(model, ()):
+            self.resolved.pop(key, None)
+            self.failed.pop(key, None)
+
+    def resolve(self, cls, model=None, type=None):
+        try:
+            regcls = self.resolved[cls, model, type]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable type list, eg. from JSON.
+            if isinstance(type, tuple):
+                raise
+            return self.resolve(cls, model, tuple(type))
+        else:
+            return regcls
+
+        # Outside the handler, so bad casts don't chain the KeyError.
+        regcls = self._resolve(cls, model, type)
+        return regcls
+
+    def _resolve(self, cls, model, type):
+        # Resolve for real and remember the outcome, good or bad.
+        key = cls, model, type
+        failed = self.failed.get(key)
+        if failed is not None:
+            raise errors.CastError(*failed[1])
+
+        model = cls._model if model is None else model
+        keys = self.models.setdefault(model, set())
+        keys.add(key)
+        try:
+            regcls = self._lookup(*key)
+        except errors.CastError as e:
+            # Keep the message, not the exception and its traceback.
+            self.failed[key] = model, e.args
+            while len(self.failed) > self.maxfailed:
+                key, (model, args) = self.failed.popitem(last=False)
+                self.models[model].discard(key)
+            raise
+
+        self.resolved[key] = regcls
+        return regcls
+
+    def _lookup(self, cls, model, type):
+        # Find the registered class for model-type that `cls` may cast to.
+        if model is None:
+            model = cls._model
+        if type is None:
+            types = (cls._type,)
+        elif isinstance(type, str):
+            types = (type,)
+        else:
+            types = tuple(type)
+
+        # Resolved class we hope to instantiate.
+        regcls = None
+        for type in types:
+            # Search for a suitable model-type.
+            try:
+                regcls = self[model, type]
+            except KeyError:
+                pass
+            else:
+                break
+
+        if regcls is None:
+            # Failed to locate a matching model-type.
+            raise errors.CastError('Bad model-type: {}-{}'.format(model, type))
+
+        if not issubclass(regcls, cls):
+            # We are going to raise because we only support proper downcast.
+            args = (cls._model, cls._type, regcls._model, regcls._type)
+            if issubclass(cls, regcls):
+                # regcls is an ancestor of `cls`; no upcasting allowed!
+                message = 'Attempted upcast: {}-{} to {}-{}'
+            else:
+                # Eh?
+                message = 'Attempted bad cast: {}-{} to {}-{}: {} to {}'
+                args += (cls, regcls)
+            message = message.format(*args)
+            raise errors.CastError(message)
+
+        return regcls
+
+
+# Values that are safe to share between copies as-is.
+_immutable = (type(None), bool, int, float, complex, str, bytes, tuple,
+              frozenset)
+
+
+class sharedcollection(collections.abc.MutableMapping):
+    """Copy-on-write view of a mapping holding models.
+
+    A copy-on-write clone and the model it was cloned from each get their own
+    view over the same `source`, which neither of them ever changes. Values
+    are copied (models cloned, again copy-on-write) the first time they are
+    looked up, so changing a child model, or anything nested in it, through
+    one side never shows up in the other. The first write copies the rest.
+    """
+
+    __slots__ = ('_source', '_data')
+
+    def __init__(self, source=None, data=None):
+        self._source = source
+        self._data = {} if data is None else data
+
+    def _mapping(self):
+        # What keys come from; copied values are always in the source too.
+        mapping = self._data if self._source is None else self._source
+        return mapping
+
+    def _frozen(self):
+        # Source for a new view of what this one holds right now. Values it
+        # copied out of its source were handed out, so they are live and go
+        # in as copies (copy-on-write) while this view keeps them.
+        source, data = self._source, self._data
+        if source is not None and not data:
+            return source
+        frozen = {}
+        for key in self._mapping():
+            if key in data:
+                frozen[key] = BaseModel._share(data[key])
+            else:
+                frozen[key] = source[key]
+        return frozen
+
+    def _load(self):
+        if self._source is not None:
+            self._data = {key: self[key] for key in self._source}
+            self._source = None
+        return self._data
+
+    def __getitem__(self, key):
+        try:
+            return self._data[key]
+        except KeyError:
+            if self._source is None:
+                raise
+        value = self._data[key] = BaseModel._share(self._source[key])
+        return value
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+
+    def __delitem__(self, key):
+        del self._load()[key]
+
+    def __contains__(self, key):
+        return key in self._mapping()
+
+    def __iter__(self):
+        return iter(self._mapping())
+
+    def __len__(self):
+        return len(self._mapping())
+
+    def __reduce__(self):
+        return type(self), (self._source, self._data)
+
+    def __repr__(self):
+        if self._source is None:
+            return '{}({!r})'.format(type(self).__name__, self._data)
+        return '<{} ({} of {} copied)>'.format(
+            type(self).__name__, len(self._data), len(self._source))
+
+
+def _holds_models(value):
+    # Whether `value` is a mapping that may hold models.
+    if not hasattr(value, 'items'):
+        return False
+    if not isinstance(value, dict):
+        # Eg. a sharedcollection or lazycollection; only models go in those.
+        return True
+    return any(hasattr(v, '_clone') for v in value.values())
+
+
 class BaseModel:
 
-    _regcache = {}
+    _regcache = Registry()
     _attributes = [('model', None), ('type', None), ('name', 0)]
     _compact_attributes = ['name']
     _key_attributes = ['type', 'name']
+    _cached_attributes = ['key']
     _simple_key = 'type'
+    # Intern cached keys; identical keys then compare by identity.
+    _intern_keys = False
+    # Build instances with a __slots__ layout instead of a __dict__.
+    _slots = False
 
     @utils.attribute
     def model(self, value):
@@ -51,21 +290,30 @@ class BaseModel:
 
     @property
     def key(self):
+        # Cached until one of `_key_attributes` is set; see __setattr__.
+        key = self.__dict__.get('_key_cache')
+        if key is not None:
+            return key
+
         values = []
-        attrs = list(self._attrs('key'))
+        attrs = self._plan.key
         for attr in attrs:
             value = getattr(self, attr)
             values.append(value)
         key = utils.qkey(*values)
+        if self._intern_keys:
+            key = sys.intern(key)
+        self.__dict__['_key_cache'] = key
         return key
 
     @key.setter
     def key(self, value):
-        values = utils.qname(value)
-        attrs = list(self._attrs('key'))
+        values = list(utils.qname(value))
+        plan = self._plan
+        attrs = list(plan.key)
         if len(values) == 1 and len(attrs) > 1:
             for key in attrs:
-                if key == self._simple_key:
+                if key == plan.simple_key:
                     # Found simple key. Set and leave.
                     setattr(self, key, values[0])
                     return
@@ -75,42 +323,8 @@ class BaseModel:
             setattr(self, attrs.pop(), values.pop())
 
     def __new__(cls, *, model=None, type=None, name=None, **kwds):
-        if model is None:
-            model = cls._model
-        if type is None:
-            types = (cls._type,)
-        elif isinstance(type, str):
-            types = (type,)
-        else:
-            types = tuple(type)
-
         # Resolved class we hope to instantiate.
-        regcls = None
-        for type in types:
-            # Search for a suitable model-type.
-            try:
-                regcls = cls._regcache[model, type]
-            except KeyError:
-                pass
-            else:
-                break
-
-        if regcls is None:
-            # Failed to locate a matching model-type.
-            raise errors.CastError('Bad model-type: {}-{}'.format(model, type))
-
-        if not issubclass(regcls, cls):
-            # We are going to raise because we only support proper downcast.
-            args = (cls._model, cls._type, regcls._model, regcls._type)
-            if issubclass(cls, regcls):
-                # regcls is an ancestor of `cls`; no upcasting allowed!
-                message = 'Attempted upcast: {}-{} to {}-{}'
-            else:
-                # Eh?
-                message = 'Attempted bad cast: {}-{} to {}-{}: {} to {}'
-                args += (cls, regcls)
-            message = message.format(*args)
-            raise errors.CastError(message)
+        regcls = cls._regcache.resolve(cls, model, type)
 
         if regcls is cls:
             # Nothing special here! Continue up the chain.
@@ -127,12 +341,19 @@ class BaseModel:
         return self
 
     def __init__(self, **kwds):
+        # Dispatch to the initializer compiled for this class; see _init().
+        self._plan.init(self, kwds)
+
+    def _init(self, kwds):
+        # Reference initializer. The compiled initializers must behave exactly
+        # like this, only without the generic lookups.
+        #
         # It's important to process attributes in order because some of them
         # are psuedo-config, eg. url -> scheme, hostname, port, etc.
-        defaults = collections.OrderedDict(self._attrs())
+        plan = self._plan
         # Seed __dict__ with static defaults for all attributes.
-        self.__dict__.update(defaults)
-        for name, default in defaults.items():
+        self.__dict__.update(plan.defaults)
+        for name, default in plan.attributes:
             if name in kwds:
                 # setattr will pass the value through any @property filter.
                 value = kwds.pop(name)
@@ -143,16 +364,23 @@ class BaseModel:
                 # Must already be in some preferred form by this point.
                 self.__dict__[name] = value
 
+        for cache in plan.caches:
+            # Getters may have cached things before all attributes were set.
+            self.__dict__.pop(cache, None)
+
         if kwds:
-            # User tried to set something unknown.
-            baddies = ', '.join(sorted(kwds))
-            message = 'Bad attributes for {}/{}: {}'
-            message = message.format(self.model, self.type, baddies)
-            raise AttributeError(message)
+            self._bad_kwds(kwds)
+
+    def _bad_kwds(self, kwds):
+        # User tried to set something unknown.
+        baddies = ', '.join(sorted(kwds))
+        message = 'Bad attributes for {}/{}: {}'
+        message = message.format(self.model, self.type, baddies)
+        raise AttributeError(message)
 
     def __repr__(self):
         attrs = []
-        for name in set(self._attrs('compact')):
+        for name in self._plan.compact:
             if name not in ('name',):
                 value = getattr(self, name)
                 if value is not None:
@@ -170,11 +398,12 @@ class BaseModel:
         return output
 
     def __len__(self):
-        length = len(self.__dict__)
+        # Every attribute is seeded into __dict__, and nothing else public is.
+        length = len(self._plan.attributes)
         return length
 
     def __iter__(self):
-        for name in collections.OrderedDict(self._attrs()):
+        for name, default in self._plan.attributes:
             value = getattr(self, name)
             yield name, value
 
@@ -216,6 +445,16 @@ class BaseModel:
             # has a @property in this name, it will be called now.
             super().__setattr__(name, value)
             # self[name] is now in a preferred format.
+            caches = self._plan.invalidates.get(name)
+            if caches:
+                # Drop anything derived from the old value, eg. the key.
+                for cache in caches:
+                    self.__dict__.pop(cache, None)
+            indexes = self.__dict__.get('_indexes')
+            if indexes:
+                # Keep every models.index.Index holding self up to date.
+                for index in indexes:
+                    index._update(self)
             return
 
         raise AttributeError('Bad {} attribute: {}'.format(self.type, name))
@@ -223,48 +462,153 @@ class BaseModel:
     def __delattr__(self, name):
         raise AttributeError('Deleting {} is not allowed.'.format(name))
 
-    def _clone(self):
-        # When copying an instance, the copy module will create a new instance
-        # and duplicate __dict__. Since we already store finalized attributes
-        # in __dict__, and all attributes are either primitives or models,
-        # everything works out of the box.
-        clone = copy.deepcopy(self)
+    def __getstate__(self):
+        # Leading underscore entries in __dict__ are per-instance bookkeeping
+        # (eg. caches, indexes) and never travel with copies.
+        state = {k: v for k, v in self.__dict__.items() if not k[:1] == '_'}
+        return state
+
+    def _clone(self, *, shared=False):
+        if not shared:
+            # When copying an instance, the copy module will create a new
+            # instance and duplicate __dict__. Since we already store finalized
+            # attributes in __dict__, and all attributes are either primitives
+            # or models, everything works out of the box.
+            clone = copy.deepcopy(self)
+            return clone
+
+        # Copy-on-write: the clone gets a new __dict__, and only models are
+        # worth sharing. Models are cloned (copy-on-write, too), and mappings
+        # holding models become a sharedcollection, so child models are only
+        # cloned once looked up. `self` keeps its own sharedcollection views
+        # as they are, but a plain mapping of models is swapped for a view
+        # too, as neither side may change the shared source from now on.
+        # Any other mutable value (lists, plain dicts, ...) is small, and
+        # simply copied.
+        clone = object.__new__(self.__class__)
+        state = self.__getstate__()
+        for name, value in state.items():
+            if isinstance(value, _immutable):
+                continue
+            if hasattr(value, '_clone'):
+                value = value._clone(shared=True)
+            elif _holds_models(value):
+                if isinstance(value, sharedcollection):
+                    source = value._frozen()
+                else:
+                    source = value
+                    self.__dict__[name] = sharedcollection(source)
+                value = sharedcollection(source)
+            else:
+                value = copy.deepcopy(value)
+            state[name] = value
+        clone.__dict__.update(state)
         return clone
 
+    @staticmethod
+    def _share(value):
+        # One-level copy of `value` that shares (copy-on-write) any models.
+        clone = getattr(value, '_clone', None)
+        if clone is not None:
+            value = clone(shared=True)
+        elif hasattr(value, 'items'):
+            value = type(value)((k, BaseModel._share(v))
+                                for k, v in value.items())
+        else:
+            value = copy.deepcopy(value)
+        return value
+
     def _merge_from(self, others, *, nulls=False):
-        for other in others:
-            self._merge(other, nulls=nulls)
+        # Fold every overlay in `others` into self, in order. The outcome is
+        # the same as merging them one at a time, but each node is visited
+        # once for all overlays, an explicit work stack replaces recursion
+        # into nested models, and values a later overlay overwrites are never
+        # copied. Like always, `nulls` only applies to the top level.
+        stack = []
+        stack.append((self._merge_node, (list(others), nulls, stack)))
+        while stack:
+            fun, args = stack.pop()
+            fun(*args)
         return self
 
     def _merge(self, other, *, nulls=False):
-        for key, value in other:
-            if value is None:
-                if nulls:
-                    # Value is None and nulls are allowed, reset key.
-                    self[key] = None
-                continue
+        merged = self._merge_from((other,), nulls=nulls)
+        return merged
 
-            if not hasattr(value, 'items'):
-                # Value is simple, overwrite whatever is there.
-                self[key] = copy.copy(value)
-                continue
+    def _merge_node(self, others, nulls, stack):
+        # Merge `others` into self but push merges into nested models onto
+        # `stack`, along with storing their containers back afterwards.
+        folded = {}
+        for other in others:
+            for key, value in other:
+                folded.setdefault(key, []).append(value)
 
-            # New value is a dict. Get current-value for comparison.
-            current = self[key]
+        pseudo = self._plan.pseudo
+        for key, values in folded.items():
+            start = 0
+            if key not in pseudo:
+                # Real attributes only care about the last overwrite, and any
+                # merges after it. Pseudo-attributes, eg. url, may only set
+                # parts of other attributes so every value must be applied.
+                for i in range(len(values) - 1, -1, -1):
+                    value = values[i]
+                    if value is None and nulls or not (
+                            value is None or hasattr(value, 'items')):
+                        start = i
+                        break
 
-            if not hasattr(current, 'items'):
-                # Current-value is simple but new-value is not. Whatever
-                # new-value contains... copy all the way down.
-                self[key] = copy.deepcopy(value)
-                continue
+            # Container being merged into, and {key2: [model, overlays]}.
+            current = None
+            children = {}
+            for value in values[start:]:
+                if value is None:
+                    if nulls:
+                        # Value is None and nulls are allowed, reset key.
+                        self[key] = None
+                        current = None
+                    continue
+
+                if not hasattr(value, 'items'):
+                    # Value is simple, overwrite whatever is there.
+                    clone = getattr(value, '_clone', None)
+                    if clone is None:
+                        value = copy.copy(value)
+                    else:
+                        value = clone(shared=True)
+                    self[key] = value
+                    current = None
+                    continue
+
+                if current is None:
+                    # New value is a dict. Get current-value for comparison.
+                    # Copy-on-write clones never share plain mutable values,
+                    # and a sharedcollection copies what it changes.
+                    current = self[key]
+                    children = {}
+
+                    if not hasattr(current, 'items'):
+                        # Current-value is simple but new-value is not.
+                        # Whatever new-value contains... copy all the way
+                        # down (sharing models).
+                        self[key] = self._share(value)
+                        current = None
+                        continue
+
+                # Containers on both sides, iterate and merge!
+                # {"...": primitive} or {model.key: model}
+                for key2, value2 in value.items():
+                    child = children.get(key2)
+                    if child is not None:
+                        # Already merging into a model, queue this one too.
+                        child[1].append(value2)
+                        continue
+
+                    current2 = current.get(key2)
+                    if hasattr(current2, '_merge'):
+                        # Merge with existing model-value (deferred).
+                        children[key2] = [current2, [value2]]
+                        continue
 
-            # Containers on both sides, iterate and merge!
-            # {"...": primitive} or {model.key: model}
-            for key2, value2 in value.items():
-                current2 = current.get(key2)
-                # Get the merge function of the current-value.
-                merge = getattr(current2, '_merge', None)
-                if merge is None:
                     # Get the clone function of the new-value then.
                     clone = getattr(value2, '_clone', None)
                     if clone is None:
@@ -272,30 +616,30 @@ class BaseModel:
                         # overwrite normally. Value can be any primitive
                         # [of primitives], but it MUST not contain models
                         # because they will not be merged!
-                        value2 = copy.deepcopy(value2)
-                        current[key2] = value2
+                        current[key2] = copy.deepcopy(value2)
                         continue
 
-                    # Clone the incoming model-value.
-                    value2 = clone()
+                    # Clone the incoming model-value. Later overlays merge
+                    # into the clone.
+                    value2 = clone(shared=True)
                     current[key2] = value2
-                    continue
-
-                # Merge (recurse) with existing model-value.
-                value2 = merge(value2)
-                current[key2] = value2
+                    children[key2] = [value2, []]
 
-            # Pass the value through any normalization.
-            self[key] = current
-
-        return self
+            if current is not None:
+                # Pass the value through any normalization, but only once the
+                # nested merges (pushed last, so popped first) are done.
+                stack.append((self.__setitem__, (key, current)))
+                for current2, others2 in children.values():
+                    if others2:
+                        args = (others2, False, stack)
+                        stack.append((current2._merge_node, args))
 
     def _config(self, attributes=None, **kwds):
         config = {}
         if attributes is None:
             attrs = set(self.__dict__)
         else:
-            attrs = set(self._attrs(attributes))
+            attrs = self._attrset(attributes)
 
         for key, value in self:
             if key in attrs:
@@ -311,8 +655,67 @@ class BaseModel:
 
         return config
 
+    def _dump(self, fp, attributes=None, *, compact=False):
+        # Write json.dumps(self._config(attributes)) to fp without building
+        # the config first. Walks the model graph with an explicit stack, so
+        # memory stays flat however big or deep the graph is. Compact mode
+        # selects `_compact_attributes` and drops whitespace.
+        if compact:
+            attributes = 'compact'
+            encoder = json.JSONEncoder(separators=(',', ':'))
+        else:
+            encoder = json.JSONEncoder()
+
+        write = fp.write
+        stack = [self._dump_chunks(attributes, encoder)]
+        while stack:
+            for chunk in stack[-1]:
+                if not isinstance(chunk, str):
+                    # Descend into a nested model, resume here afterwards.
+                    stack.append(chunk._dump_chunks(attributes, encoder))
+                    break
+                write(chunk)
+            else:
+                stack.pop()
+
+    def _dump_chunks(self, attributes, encoder):
+        # Mirrors _config(); yields JSON chunks, or models to dump in place.
+        if attributes is None:
+            attrs = self.__dict__
+        else:
+            attrs = self._attrset(attributes)
+
+        encode = encoder.encode
+        separator = encoder.item_separator
+        colon = encoder.key_separator
+        prefix = '{'
+        for key, value in self:
+            if key not in attrs or value is None:
+                continue
+
+            yield prefix + encode(key) + colon
+            prefix = separator
+            if not hasattr(value, 'items'):
+                yield from encoder.iterencode(value)
+                continue
+
+            prefix2 = '{'
+            for k2, v2 in value.items():
+                if not isinstance(k2, str):
+                    # Same coercion json applies to keys.
+                    k2 = encode(k2)
+                yield prefix2 + encode(k2) + colon
+                prefix2 = separator
+                if hasattr(v2, '_dump_chunks'):
+                    yield v2
+                else:
+                    yield from encoder.iterencode(v2)
+            yield '{}' if prefix2 == '{' else '}'
+
+        yield '{}' if prefix == '{' else '}'
+
     @classmethod
-    def __init_subclass__(cls, model=None, type=None, **kwds):
+    def __init_subclass__(cls, model=None, type=None, slots=None, **kwds):
         super().__init_subclass__(**kwds)
 
         # Normalize and guarantee mutable, class-local attributes.
@@ -357,25 +760,227 @@ class BaseModel:
             # Register this class for the specified model type.
             cls._regcache[model, type] = cls
 
+        if slots is None:
+            slots = cls._slots
+        cls._slots = slots
+
+        cls._compile()
+
+    @classmethod
+    def _compile(cls):
+        # Walk the MRO once and freeze every `[_*]_attributes` section. Call
+        # again after mutating any section (on this class, a base, or a mixin)
+        # and every subclass will be recompiled with it.
+        sections = {}
+        for base in reversed(cls.__mro__):
+            for key, attributes in base.__dict__.items():
+                if (key.startswith('_') and key.endswith('_attributes') and
+                        isinstance(attributes, (list, tuple))):
+                    sections.setdefault(key, []).extend(attributes)
+
+        for key, attributes in sections.items():
+            if key == '_attributes':
+                # Order by first appearance, but let the last default win.
+                pairs = collections.OrderedDict()
+                for attrdef in attributes:
+                    try:
+                        attr, default = () + attrdef
+                    except TypeError:
+                        attr, default = attrdef, None
+                    pairs[attr] = default
+                sections[key] = tuple(pairs.items())
+            else:
+                sections[key] = tuple(dict.fromkeys(attributes))
+
+        attributes = sections.setdefault('_attributes', ())
+        caches = []
+        invalidates = {}
+        for cached in sections.get('_cached_attributes', ()):
+            cache = '_{}_cache'.format(cached)
+            caches.append(cache)
+            for attr in sections.get('_{}_attributes'.format(cached), ()):
+                invalidates[attr] = invalidates.get(attr, ()) + (cache,)
+
+        names = {}
+        for key, attributes2 in sections.items():
+            if key == '_attributes':
+                attributes2 = (attr for attr, default in attributes2)
+            names[key] = frozenset(attributes2)
+
+        plan = Plan(sections=types.MappingProxyType(sections),
+                    names=types.MappingProxyType(names),
+                    attributes=attributes,
+                    defaults=types.MappingProxyType(dict(attributes)),
+                    compact=names.get('_compact_attributes', frozenset()),
+                    key=sections.get('_key_attributes', ()),
+                    simple_key=cls._simple_key,
+                    caches=tuple(caches),
+                    invalidates=types.MappingProxyType(invalidates),
+                    pseudo=frozenset(cls._pseudo(attributes)),
+                    init=cls._compile_init(attributes, caches))
+        cls._plan = plan
+
+        subclasses = cls.__subclasses__()
+        if cls._slots and '__slots__' not in cls.__dict__:
+            # Slot layouts are fixed once created, so generate a new slotted
+            # class for every plan; see _compile_slots().
+            cls._compile_slots()
+
+        for subcls in subclasses:
+            if subcls.__dict__.get('_generated'):
+                # Superseded by the slotted class generated above, and its
+                # layout has no room for new attributes anyway.
+                continue
+            subcls._compile()
+
+        return plan
+
+    @classmethod
+    def _compile_slots(cls):
+        # Generate a subclass storing attributes in __slots__ and register it
+        # in place of `cls`, so cls(...), _from_config(), etc. build it. The
+        # real __dict__ is only created once something other than attributes,
+        # caches and indexes is stored (eg. a props.caching value); a
+        # utils.slotdict stands in for it. Attributes behind a descriptor
+        # (filter, @property, ...) keep it and get a `_slot_<name>` slot
+        # instead, shadowing nothing. Pickle can't find the generated class
+        # by name, so instances pickle through the registry instead.
+        slots = {}
+        for name, default in cls._plan.attributes:
+            attr = cls._classattr(name)
+            slot = name
+            if hasattr(type(attr), '__set__'):
+                slot = '_slot_' + name
+            slots[name] = slot
+        for name in cls._plan.caches + ('_indexes',):
+            slots[name] = name
+
+        for base in cls.__mro__:
+            fallback = base.__dict__.get('__dict__')
+            if fallback is not None:
+                break
+        view = type('slotdict', (utils.slotdict,), {'__slots__': (),
+                                                    'fallback': fallback})
+        ns = {'__slots__': tuple(slots.values()) + ('_fallback',),
+              '__dict__': property(view),
+              '__reduce__': _reduce_slotted,
+              '_generated': True,
+              '__module__': cls.__module__,
+              '__qualname__': cls.__qualname__,
+              '__doc__': cls.__doc__}
+        slotted = type(cls)(cls.__name__, (cls,), ns,
+                            model=cls._model, type=cls._type)
+        view.members = {name: slotted.__dict__[slot]
+                        for name, slot in slots.items()}
+        view.created = slotted.__dict__['_fallback']
+        return slotted
+
+    @classmethod
+    def _stored(cls, attr):
+        # Whether `attr` simply stores values, ie. set() has no side effects
+        # and get() returns what was stored.
+        stored = attr is None or isinstance(attr, (utils.attribute,
+                                                   types.MemberDescriptorType))
+        return stored
+
+    @classmethod
+    def _classattr(cls, name):
+        # Whatever the class has in `name`, without invoking descriptors.
+        for base in cls.__mro__:
+            if name in base.__dict__:
+                attr = base.__dict__[name]
+                return attr
+
+    @classmethod
+    def _pseudo(cls, attributes):
+        # Attributes set through anything but __dict__ or a utils.attribute
+        # filter; setting them may have side effects on other attributes.
+        for name, default in attributes:
+            attr = cls._classattr(name)
+            if hasattr(type(attr), '__set__') and not cls._stored(attr):
+                yield name
+
+    @classmethod
+    def _compile_init(cls, attributes, caches=()):
+        # Generate an initializer equivalent to _init() for this class, much
+        # like dataclasses generate __init__. Every attribute is classified
+        # once, up front, by whatever the class has under its name:
+        #
+        #   nothing: value goes straight into __dict__.
+        #   utils.attribute, slot: set is called, default kept otherwise.
+        #   data descriptor (@property): setter on set, getter otherwise.
+        #   anything else: __dict__ shadows it, same as plain.
+        #
+        # A class overriding __setattr__ gets setattr() for passed values.
+        custom = cls.__setattr__ is not BaseModel.__setattr__
+        env = {'defaults': dict(attributes)}
+        lines = ['def __init__(self, kwds):',
+                 '    __dict__ = self.__dict__',
+                 '    __dict__.update(defaults)']
+        for i, (name, default) in enumerate(attributes):
+            attr = cls._classattr(name)
+            descriptor = hasattr(type(attr), '__set__')
+            lines.extend([f'    if {name!r} in kwds:',
+                          f'        value = kwds.pop({name!r})'])
+            if custom:
+                lines.append(f'        setattr(self, {name!r}, value)')
+            elif descriptor:
+                env[f'set_{i}'] = attr.__set__
+                lines.append(f'        set_{i}(self, value)')
+            else:
+                lines.append(f'        __dict__[{name!r}] = value')
+
+            if descriptor and not cls._stored(attr):
+                env[f'get_{i}'] = attr.__get__
+                env[f'default_{i}'] = default
+                lines.extend(['    else:',
+                              '        try:',
+                             f'            value = get_{i}(self, type(self))',
+                              '        except AttributeError:',
+                             f'            value = default_{i}',
+                             f'        __dict__[{name!r}] = value'])
+
+        for cache in caches:
+            lines.append(f'    __dict__.pop({cache!r}, None)')
+        lines.extend(['    if kwds:',
+                      '        self._bad_kwds(kwds)'])
+        exec('\n'.join(lines), env)
+        init = env['__init__']
+        init.__qualname__ = f'{cls.__qualname__}._plan.init'
+        return init
+
+    @classmethod
+    def _resolve(cls, model=None, type=None):
+        # Find the registered class for model-type that `cls` may cast to.
+        regcls = cls._regcache.resolve(cls, model, type)
+        return regcls
+
     @classmethod
     def _attrs(cls, *sections):
         # Generic function to resolve `[_*]_attributes`.
         sections += ('attributes',)
         key = '_' + '_'.join(sections)
-        for base in reversed(cls.__mro__):
-            attributes = base.__dict__.get(key)
-            if attributes is not None:
-                yield from attributes
+        attributes = cls._plan.sections.get(key, ())
+        return iter(attributes)
+
+    @classmethod
+    def _attrset(cls, *sections):
+        # Like _attrs() but a frozenset of names, for membership tests.
+        sections += ('attributes',)
+        key = '_' + '_'.join(sections)
+        attributes = cls._plan.names.get(key, frozenset())
+        return attributes
 
     @classmethod
     def _key_to_config(cls, key):
         values = utils.qname(key)
-        attrs = list(cls._attrs('key'))
+        plan = cls._plan
+        attrs = plan.key
 
         if len(values) == 1 and len(attrs) > 1:
             simple = values[0]
             for key in attrs:
-                if key == cls._simple_key:
+                if key == plan.simple_key:
                     # Found simple key. Return simple config.
                     return {key: simple, 'type': (simple, '_')}
 
@@ -398,3 +1003,55 @@ class BaseModel:
         config = dict(config)
         dep = cls(**config)
         return dep
+
+    @classmethod
+    def _from_keyconfigs(cls, keyconfigs, *, failures=None):
+        # Batch version of _from_keyconfig(); see _from_configs().
+        def configs():
+            for key, config in keyconfigs:
+                more = cls._key_to_config(key)
+                more.update(config or ())
+                yield more
+        deps = cls._from_configs(configs(), failures=failures)
+        return deps
+
+    @classmethod
+    def _from_configs(cls, configs, *, failures=None):
+        # Batch version of _from_config(). Large config trees tend to share a
+        # handful of model-types, and the registry resolves each distinct
+        # (model, type) once; models are then built lazily in input order.
+        # Pass a list as `failures` to collect `(config, error)` for configs
+        # that fail to cast or set attributes, instead of raising.
+        resolve = cls._regcache.resolve
+        for config in configs:
+            # Support iterables.
+            config = dict(config)
+            model, type = config.get('model'), config.get('type')
+
+            try:
+                regcls = resolve(cls, model, type)
+                # Same as cls(**config) minus __new__() resolving again.
+                dep = object.__new__(regcls)
+                dep.__init__(**config)
+            except (errors.CastError, AttributeError) as e:
+                if failures is None:
+                    raise
+                failures.append((config, e))
+                continue
+
+            yield dep
+
+
+def _reduce_slotted(self):
+    # __reduce__ of generated slotted classes; see _compile_slots().
+    return _restore_slotted, (self._model, self._type, self.__getstate__())
+
+
+def _restore_slotted(model, type, state):
+    cls = BaseModel._regcache[model, type]
+    self = object.__new__(cls)
+    self.__dict__.update(state)
+    return self
+
+
+BaseModel._compile()
@@ -1,2 +1,6 @@
 class CastError(TypeError):
     pass
+
+
+class SnapshotError(ValueError):
+    pass
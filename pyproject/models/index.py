@@ -0,0 +1,198 @@
+import bisect
+import collections.abc
+
+
+class Index:
+    """Secondary indexes over a model graph.
+
+    Every model added (and, by default, every model nested in it) is hash
+    indexed by `(model, type, name)` and by each name in `attributes`, and
+    kept in a sorted index for each name in `ordered` to answer range and
+    prefix queries on string values. Unhashable values aren't hash indexed
+    and only strings are sorted.
+
+    Indexed models hold the index in `_indexes`, and BaseModel.__setattr__
+    calls back into it, so lookups follow attribute changes (including
+    merges, url/key setters, ...). Clones are not indexed, so add() models
+    that a merge brings in.
+    """
+
+    def __init__(self, models=(), *, attributes=(), ordered=()):
+        self.attributes = tuple(attributes)
+        self.ordered = tuple(ordered)
+        # {id: model} and {id: {attribute: value indexed}}.
+        self.models = {}
+        self.values = {}
+        # {(model, type, name): {id: model}}, and {value: {id: model}} for
+        # each of model, type and name on their own.
+        self.idents = {}
+        self.parts = ({}, {}, {})
+        # {attribute: {value: {id: model}}}.
+        self.hashed = {attribute: {} for attribute in self.attributes}
+        # {attribute: [(value, id)]}, sorted.
+        self.sorted = {attribute: [] for attribute in self.ordered}
+        for model in models:
+            self.add(model)
+
+    def __len__(self):
+        return len(self.models)
+
+    def __contains__(self, model):
+        return id(model) in self.models
+
+    def add(self, model, *, nested=True):
+        models = _walk(model) if nested else (model,)
+        for model in models:
+            if id(model) in self.models:
+                continue
+            self.models[id(model)] = model
+            indexes = model.__dict__.get('_indexes') or ()
+            model.__dict__['_indexes'] = indexes + (self,)
+            self._insert(model)
+
+    def remove(self, model, *, nested=True):
+        models = _walk(model) if nested else (model,)
+        for model in models:
+            if self.models.pop(id(model), None) is None:
+                continue
+            self._delete(model)
+            indexes = tuple(index for index in model.__dict__['_indexes']
+                            if index is not self)
+            model.__dict__['_indexes'] = indexes or None
+
+    def lookup(self, model=None, type=None, name=None):
+        # Models matching (model, type, name); any left out match anything.
+        # Names are as stored, eg. ints for local scope names.
+        ident = model, type, name
+        if None not in ident:
+            found = self.idents.get(ident, {})
+            return list(found.values())
+
+        buckets = [parts.get(value, {}) for parts, value
+                   in zip(self.parts, ident) if value is not None]
+        if not buckets:
+            return list(self.models.values())
+        buckets.sort(key=len)
+        found, rest = buckets[0], buckets[1:]
+        return [model for key, model in found.items()
+                if all(key in bucket for bucket in rest)]
+
+    def find(self, **values):
+        # Models whose hash indexed attributes equal all `values`.
+        found = None
+        for attribute, value in values.items():
+            try:
+                hashed = self.hashed[attribute]
+            except KeyError:
+                raise ValueError('Not indexed: {}'.format(attribute))
+            models = hashed.get(value, {})
+            if found is None:
+                found = dict(models)
+            else:
+                found = {k: v for k, v in found.items() if k in models}
+            if not found:
+                break
+        return list((found or {}).values())
+
+    def range(self, attribute, start=None, stop=None):
+        # Models whose `attribute` is in [start, stop), ordered by it.
+        entries = self._sorted(attribute)
+        lo = 0 if start is None else bisect.bisect_left(entries, (start,))
+        hi = len(entries)
+        if stop is not None:
+            hi = bisect.bisect_left(entries, (stop,))
+        return [self.models[id] for value, id in entries[lo:hi]]
+
+    def prefix(self, attribute, prefix):
+        # Models whose `attribute` starts with `prefix`, ordered by it.
+        entries = self._sorted(attribute)
+        found = []
+        for i in range(bisect.bisect_left(entries, (prefix,)), len(entries)):
+            value, id = entries[i]
+            if not value.startswith(prefix):
+                break
+            found.append(self.models[id])
+        return found
+
+    def _sorted(self, attribute):
+        try:
+            return self.sorted[attribute]
+        except KeyError:
+            raise ValueError('Not ordered: {}'.format(attribute))
+
+    def _update(self, model):
+        # Called by BaseModel.__setattr__ after any attribute is set.
+        if self.values.get(id(model)) != self._values(model):
+            self._delete(model)
+            self._insert(model)
+
+    def _values(self, model):
+        values = {attribute: getattr(model, attribute, None)
+                  for attribute in self.attributes + self.ordered}
+        values[None] = model.model, model.type, model.name
+        return values
+
+    def _insert(self, model):
+        key = id(model)
+        values = self.values[key] = self._values(model)
+        self.idents.setdefault(values[None], {})[key] = model
+        for parts, value in zip(self.parts, values[None]):
+            parts.setdefault(value, {})[key] = model
+        for attribute in self.attributes:
+            try:
+                self.hashed[attribute].setdefault(values[attribute], {})
+            except TypeError:
+                # Unhashable.
+                continue
+            self.hashed[attribute][values[attribute]][key] = model
+        for attribute in self.ordered:
+            value = values[attribute]
+            if isinstance(value, str):
+                bisect.insort(self.sorted[attribute], (value, key))
+
+    def _delete(self, model):
+        key = id(model)
+        values = self.values.pop(key)
+        _discard(self.idents, values[None], key)
+        for parts, value in zip(self.parts, values[None]):
+            _discard(parts, value, key)
+        for attribute in self.attributes:
+            try:
+                _discard(self.hashed[attribute], values[attribute], key)
+            except TypeError:
+                continue
+        for attribute in self.ordered:
+            value = values[attribute]
+            if isinstance(value, str):
+                entries = self.sorted[attribute]
+                i = bisect.bisect_left(entries, (value, key))
+                if i < len(entries) and entries[i] == (value, key):
+                    del entries[i]
+
+
+def _discard(buckets, value, key):
+    bucket = buckets.get(value)
+    if bucket is not None:
+        bucket.pop(key, None)
+        if not bucket:
+            del buckets[value]
+
+
+def _walk(model):
+    # The model and every model nested in its attributes, each once.
+    seen = set()
+    stack = [model]
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+
+        if hasattr(value, '_plan'):
+            yield value
+            stack.extend(reversed([value.__dict__.get(attr) for attr, default
+                                   in value._plan.attributes]))
+        elif isinstance(value, collections.abc.Mapping):
+            stack.extend(reversed(list(value.values())))
+        elif isinstance(value, (list, tuple)):
+            stack.extend(reversed(value))
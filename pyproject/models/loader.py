@@ -0,0 +1,310 @@
+import collections
+import json
+import os
+import pickle
+import time
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+from .. import settings
+from . import errors
+from . import model
+
+
+def _parse_json(path):
+    with open(path, 'rb') as fp:
+        config = json.load(fp)
+    return config
+
+
+def _parse_toml(path):
+    with open(path, 'rb') as fp:
+        config = tomllib.load(fp)
+    return config
+
+
+# Parsers by file suffix.
+PARSERS = {'.json': _parse_json}
+if tomllib is not None:
+    PARSERS['.toml'] = _parse_toml
+
+
+def parse(path):
+    # Module level so process pools can pickle it.
+    suffix = os.path.splitext(path)[1]
+    config = PARSERS[suffix](path)
+    return config
+
+
+def _parse_or_error(path):
+    # Return `(config, None)`, or `(None, error)` if `path` fails to parse.
+    try:
+        return parse(path), None
+    except Exception as e:
+        return None, e
+
+
+class Loader:
+    """Load config trees into models.
+
+    Every root holds `config/<qualifier>/**/<key>.<suffix>` files, where the
+    key is the path relative to the qualifier dir minus the suffix (eg.
+    `service/web.json` is `service/web`, `_/_.json` holds the defaults).
+    Each model is built with `_from_keyconfig()` from the defaults first and
+    its own files after, merged in root order, so later roots overlay
+    earlier ones.
+
+    Parsing goes through `executor` (a thread or process pool) if given, and
+    parsed configs are pickled to `cache` (a file path) if given, keyed by
+    path, mtime and size; a warm start then parses nothing.
+
+    Once loaded, reload() (or watch(), which polls it) stats the tree again
+    and only reparses changed files and rebuilds the keys built from them.
+
+    Files that fail to parse are kept in `errors` until they change again,
+    and the keys built from them fail as a whole (see `failures`); reload()
+    keeps the last good models for those keys meanwhile.
+    """
+
+    DEFAULTS = '_/_'
+
+    def __init__(self, roots=('.',), *, cls=None,
+                 qualifiers=settings.QUALIFIERS, executor=None, cache=None):
+        self.roots = tuple(roots)
+        self.cls = cls or model.Model
+        self.qualifiers = tuple(qualifiers)
+        self.executor = executor
+        self.cache = cache
+        # {path: (stat, config)} as of the last load, keeping the last good
+        # entry of files that fail to parse, and {path: (stat, error)} for
+        # those.
+        self.parsed = {}
+        self.errors = {}
+        # {qualifier: {key: model}} and {qualifier: {key: paths}}.
+        self.models = {}
+        self.sources = {}
+
+    def discover(self):
+        # Return {qualifier: {key: paths}}, paths in root order.
+        found = {}
+        for qualifier in self.qualifiers:
+            keys = found[qualifier] = collections.defaultdict(list)
+            for root in self.roots:
+                top = os.path.join(root, settings.CONFIG_DIR, qualifier)
+                for dirpath, dirnames, filenames in os.walk(top):
+                    dirnames.sort()
+                    for filename in sorted(filenames):
+                        stem, suffix = os.path.splitext(filename)
+                        if suffix not in PARSERS or stem.startswith('.'):
+                            continue
+                        path = os.path.join(dirpath, filename)
+                        key = os.path.relpath(path, top)[:-len(suffix)]
+                        key = key.replace(os.sep, settings.QNAME_SEPARATOR)
+                        keys[key].append(path)
+            found[qualifier] = dict(keys)
+        return found
+
+    def load(self, *, failures=None):
+        # Return {qualifier: {key: model}}. Pass a list as `failures` to
+        # collect `(key, error)` for keys that fail instead of raising.
+        found = self.discover()
+        self.errors = {}
+        self.parsed = self._parse(self._paths(found), self._read_cache())
+        self._write_cache()
+
+        self.sources = {}
+        self.models = {}
+        for qualifier, keys in found.items():
+            self.models[qualifier] = self._build(qualifier, keys, keys,
+                                                 failures=failures)
+        return self.models
+
+    def reload(self, *, failures=None):
+        # Rebuild only the models whose files (or defaults) were added,
+        # changed or removed, and return {qualifier: keys} for those. Keys
+        # with a file that now fails to parse keep their last good model and
+        # are reported once, as `(key, error)` in `failures` if given (else
+        # the first error is raised, once everything else is reloaded).
+        found = self.discover()
+        old, failed = self.parsed, self.errors
+        self.parsed = self._parse(self._paths(found), old)
+        # Up to date entries are reused as-is; anything else changed.
+        changed = {path for path, entry in self.parsed.items()
+                   if old.get(path) is not entry}
+        changed.update(old.keys() - self.parsed.keys())
+        # Same for errors; the rest were reported already.
+        broken = {path for path, entry in self.errors.items()
+                  if failed.get(path) is not entry}
+        if not changed and not broken:
+            return {}
+        self._write_cache()
+
+        report = [] if failures is None else failures
+        rebuilt = {}
+        for qualifier, keys in found.items():
+            models = self.models.setdefault(qualifier, {})
+            sources = self.sources.setdefault(qualifier, {})
+            stale = sources.keys() - keys.keys()
+            for key in stale:
+                models.pop(key, None)
+                del sources[key]
+
+            defaults = keys.get(self.DEFAULTS, [])
+            build = []
+            for key, paths in keys.items():
+                if key != self.DEFAULTS:
+                    paths = defaults + paths
+                error = self._error(paths)
+                if error is not None:
+                    # Keep the last good model, and its sources so it is
+                    # rebuilt once fixed.
+                    if not broken.isdisjoint(paths):
+                        report.append((key, error))
+                    continue
+                if paths != sources.get(key) or not changed.isdisjoint(paths):
+                    models.pop(key, None)
+                    build.append(key)
+            models.update(self._build(qualifier, keys, build,
+                                      failures=report))
+
+            stale.update(build)
+            if stale:
+                rebuilt[qualifier] = stale
+
+        if failures is None and report:
+            raise report[0][1]
+        return rebuilt
+
+    def watch(self, interval=1.0, *, failures=None):
+        # Poll for changes forever, yielding what reload() reports whenever
+        # something changed. Stat based, so it works anywhere. Never stops
+        # over broken files; without `failures`, see `errors` for those.
+        if not self.parsed:
+            self.load(failures=[] if failures is None else failures)
+        while True:
+            time.sleep(interval)
+            rebuilt = self.reload(failures=[] if failures is None
+                                  else failures)
+            if rebuilt:
+                yield rebuilt
+
+    def _build(self, qualifier, keys, build, *, failures=None):
+        # Build the models for the keys in `build`, out of all `keys`.
+        defaults = keys.get(self.DEFAULTS, [])
+        sources = self.sources.setdefault(qualifier, {})
+        models = {}
+        for key in build:
+            paths = keys[key]
+            if key != self.DEFAULTS:
+                paths = defaults + paths
+            sources[key] = paths
+            error = self._error(paths)
+            try:
+                if error is None:
+                    models[key] = self._model(key, paths)
+            except (errors.CastError, AttributeError, ValueError) as e:
+                error = e
+            if error is not None:
+                if failures is None:
+                    raise error
+                failures.append((key, error))
+        return models
+
+    def _error(self, paths):
+        # The parse error of the first broken file in `paths`, if any.
+        for path in paths:
+            entry = self.errors.get(path)
+            if entry is not None:
+                return entry[1]
+
+    @staticmethod
+    def _paths(found):
+        paths = [path for keys in found.values()
+                      for key_paths in keys.values()
+                      for path in key_paths]
+        return paths
+
+    def _model(self, key, paths):
+        configs = [self.parsed[path][1] for path in paths]
+        layers = [self.cls._from_keyconfig(key, config) for config in configs]
+        object = layers[0]
+        if len(layers) > 1:
+            object._merge_from(layers[1:])
+        return object
+
+    def _parse(self, paths, cached):
+        # Return {path: (stat, config)}, reusing `cached` where up to date.
+        # Files that fail to parse go to `errors` instead, keeping whatever
+        # entry was cached for them, and are only parsed again once changed.
+        previous, self.errors = self.errors, {}
+        parsed = {}
+        pending = []
+        for path in paths:
+            try:
+                stat = self._stat(path)
+            except OSError as e:
+                # Gone since discover().
+                self._failed(path, None, e, previous, cached, parsed)
+                continue
+            entry = cached.get(path)
+            failed = previous.get(path)
+            if entry is not None and entry[0] == stat:
+                parsed[path] = entry
+            elif failed is not None and failed[0] == stat:
+                self._failed(path, stat, failed[1], previous, cached, parsed)
+            else:
+                pending.append((path, stat))
+
+        if self.executor is None:
+            results = map(_parse_or_error, [path for path, stat in pending])
+        else:
+            results = self.executor.map(_parse_or_error,
+                                        [path for path, stat in pending])
+        for (path, stat), (config, error) in zip(pending, results):
+            if error is None:
+                parsed[path] = stat, config
+            else:
+                self._failed(path, stat, error, previous, cached, parsed)
+        return parsed
+
+    def _failed(self, path, stat, error, previous, cached, parsed):
+        # Record the error, as the same entry as before if the file did not
+        # change since (reload() only reports new entries).
+        failed = previous.get(path)
+        if failed is None or failed[0] != stat:
+            failed = stat, error
+        self.errors[path] = failed
+        if path in cached:
+            parsed[path] = cached[path]
+
+    @staticmethod
+    def _stat(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_cache(self):
+        if self.cache is None:
+            return self.parsed
+        try:
+            with open(self.cache, 'rb') as fp:
+                cached = pickle.load(fp)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            cached = {}
+        cached.update(self.parsed)
+        return cached
+
+    def _write_cache(self):
+        if self.cache is None:
+            return
+        tmp = '{}.{}.tmp'.format(self.cache, os.getpid())
+        with open(tmp, 'wb') as fp:
+            pickle.dump(self.parsed, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.cache)
+
+
+def load(roots=('.',), **kwds):
+    objects = Loader(roots, **kwds).load()
+    return objects
@@ -1,5 +1,7 @@
 import collections
 import copy
+import functools
+import itertools
 import json
 import urllib.parse
 
@@ -11,7 +13,7 @@ class WithEnviroment:
     _compact_attributes = ['env']
     _attributes = [('env', None)]
 
-    def _env(self, objects=None, escape=None):
+    def _env(self, objects=None, escape=None, *, cache=None):
         if objects is None:
             objects = [self]
         elif objects is False:
@@ -20,13 +22,45 @@ class WithEnviroment:
         env = {}
         missing = {}
         envns = utils.envnamespace(self.env)
-        for key, value, missed in envns.format_all(objects, escape=escape):
+        formatted = envns.format_all(objects, escape=escape, cache=cache)
+        for key, value, missed in formatted:
             env[key] = value
             if missed:
                 missing[key] = missed
 
         return env, missing
 
+    def _envtracker(self, objects=None, escape=None):
+        # Like _env(), but the result can refresh only the keys that change.
+        if objects is None:
+            objects = [self]
+        elif objects is False:
+            objects = []
+
+        tracker = utils.envtracker(self.env, objects, escape=escape)
+        return tracker
+
+    @staticmethod
+    def _envs(pairs, escape=None, *, executor=None, chunksize=64, window=16):
+        # Batch version of _env() over `(model, objects)` pairs, yielding
+        # `(env, missing)` per pair in order. Templates compile once per
+        # string, and attribute paths resolve once per object within a chunk.
+        # Give an executor to render chunks in parallel, at most `window`
+        # chunks at a time; with a process pool the models and objects must
+        # pickle.
+        render = functools.partial(_render_envs, escape=escape)
+        results = _imap(render, _chunks(pairs, chunksize), executor, window)
+        for result in results:
+            yield from result
+
+
+def _render_envs(pairs, escape=None):
+    # Module level so process pools can pickle it.
+    cache = {}
+    results = [model._env(objects, escape=escape, cache=cache)
+               for model, objects in pairs]
+    return results
+
 
 class WithImage:
 
@@ -39,8 +73,20 @@ class WithImage:
                    ('image_tag', None),
                    ('command', None)]
 
+    # The composed image is cached until one of these is set.
+    _cached_attributes = ['image']
+    _image_attributes = ['image_id',
+                         'image_registry',
+                         'image_project',
+                         'image_name',
+                         'image_tag']
+
     @property
     def image(self):
+        image = self.__dict__.get('_image_cache')
+        if image is not None:
+            return image
+
         image = ''
         if self.image_name:
             image += self.image_name
@@ -52,6 +98,7 @@ class WithImage:
             image = self.image_project + '/' + image
         if self.image_registry:
             image = self.image_registry + '/' + image
+        self.__dict__['_image_cache'] = image
         return image
 
     @image.setter
@@ -62,22 +109,12 @@ class WithImage:
         if not value:
             return
 
-        value = ((2 - value.count('/')) * '/') + value
-        registry, project, nametag = value.split('/')
-        nametag = nametag + ((1 - nametag.count(':')) * ':')
-        name, tag = nametag.split(':')
-        if name.endswith('@sha256'):
-            id = tag
-            tag = None
-            name = name[:-7]
-        else:
-            id = None
-
-        updates = {'image_registry': registry or None,
-                   'image_project': project or None,
-                   'image_name': name or None,
-                   'image_tag': tag or None,
-                   'image_id': id or None}
+        registry, project, name, tag, id = utils.parse_image(value)
+        updates = {'image_registry': registry,
+                   'image_project': project,
+                   'image_name': name,
+                   'image_tag': tag,
+                   'image_id': id}
         for key, value in updates.items():
             if value is not None:
                 setattr(self, key, value)
@@ -95,12 +132,26 @@ class WithUrl:
                    ('path', None),
                    ('query', None),
                    ('fragment', None)]
+    # The composed url and netloc are cached until one of these is set.
+    _cached_attributes = ['url', 'netloc']
+    _url_attributes = ['scheme',
+                       'username',
+                       'password',
+                       'hostname',
+                       'port',
+                       'path',
+                       'query',
+                       'fragment']
+    _netloc_attributes = ['username', 'password', 'hostname', 'port']
 
     @utils.attribute
     def query(self, query):
         if isinstance(query, str):
-            query = urllib.parse.parse_qsl(query)
-        if query is not None:
+            query = collections.OrderedDict(utils.parse_query(query))
+            for key, value in query.items():
+                if not isinstance(value, (str, int, float, bool)):
+                    query[key] = copy.deepcopy(value)
+        elif query is not None:
             query = collections.OrderedDict(query)
             for key, value in query.items():
                 try:
@@ -121,10 +172,14 @@ class WithUrl:
         if value is not None:
             if not isinstance(value, str):
                 value = ','.join(value)
-        self.__dict__['hostname'] = value
+        setattr(self, 'hostname', value)
 
     @property
     def netloc(self):
+        netloc = self.__dict__.get('_netloc_cache')
+        if netloc is not None:
+            return netloc
+
         netloc = ''
         if self.username:
             netloc += urllib.parse.quote(self.username, safe='')
@@ -136,6 +191,7 @@ class WithUrl:
             netloc += self.hostname
         if self.port:
             netloc += ':' + str(self.port)
+        self.__dict__['_netloc_cache'] = netloc
         return netloc
 
     @netloc.setter
@@ -146,45 +202,45 @@ class WithUrl:
                 setattr(self, name, None)
             return
 
-        url = urllib.parse.urlsplit('//' + value)
-        for name in fields:
-            output = getattr(url, name)
-            if output is not None:
-                if name in ('username', 'password'):
-                    output = urllib.parse.unquote(output)
-                setattr(self, name, output)
+        for name, output in utils.parse_netloc(value):
+            setattr(self, name, output)
 
     @property
     def url(self):
-        netloc = ''
-        if self.username:
-            netloc += urllib.parse.quote(self.username, safe='')
-        if self.password:
-            netloc += ':' + urllib.parse.quote(self.password, safe='')
-        if self.hostname:
-            if netloc:
-                netloc += '@'
-            netloc += self.hostname
-        if self.port:
-            netloc += ':' + str(self.port)
-
-        query = self.query or ()
-        for key in query:
-            value = query[key]
-            if not isinstance(value, str):
-                value = json.dumps(value)
-                query[key] = value
-        query = urllib.parse.urlencode(query)
+        # The query can be changed in place, so the cache also remembers what
+        # it was built from: the very items of a query of plain scalars, or
+        # else the encoded pairs, as mutable values change deep down.
+        query = self.query or {}
+        cache = self.__dict__.get('_url_cache')
+        pairs = None
+        if cache is not None:
+            url, items, encoded = cache
+            if items is not None:
+                if _same_items(items, query):
+                    return url
+            else:
+                pairs = _query_pairs(query)
+                if pairs == encoded:
+                    return url
+
+        if pairs is None:
+            pairs = _query_pairs(query)
+        netloc = self.netloc
 
         parts = {'scheme': self.scheme or '',
                  'netloc': netloc,
                  'path': self.path or '',
-                 'query': query,
+                 'query': urllib.parse.urlencode(pairs),
                  'fragment': self.fragment or ''}
 
         fields = urllib.parse.SplitResult._fields
         url = urllib.parse.SplitResult._make(parts[field] for field in fields)
-        return url.geturl()
+        url = url.geturl()
+        items = tuple(query.items())
+        if not all(type(value) in _SCALARS for key, value in items):
+            items = None
+        self.__dict__['_url_cache'] = url, items, pairs
+        return url
 
     @url.setter
     def url(self, value):
@@ -197,13 +253,8 @@ class WithUrl:
                 setattr(self, name, None)
             return
 
-        url = urllib.parse.urlsplit(value or '')
-        for name in fields:
-            output = getattr(url, name) or None
-            if output is not None:
-                if name in ('username', 'password'):
-                    output = urllib.parse.unquote(output)
-                setattr(self, name, output)
+        for name, output in utils.parse_url(value or ''):
+            setattr(self, name, output)
 
 
 class WithConnectionUrl(WithUrl):
@@ -224,6 +275,108 @@ class WithConnectionUrl(WithUrl):
             value = '/' + value
         setattr(self, 'path', value)
 
+    @classmethod
+    def _normalize(cls, values, *, urls=False, expand=False, executor=None,
+                   chunksize=256, window=16):
+        # Stream normalized models, or their canonical urls if `urls`, from
+        # url strings and/or configs. Repeated inputs are handled and yielded
+        # once, and with `expand` a multi-host url yields one result per host.
+        # Give an executor to normalize chunks in parallel, at most `window`
+        # chunks at a time; with a process pool `cls` must be importable so
+        # it pickles.
+        normalize = functools.partial(_normalize_urls, cls,
+                                      options=(urls, expand))
+        chunks = _chunks(_unique(values), chunksize)
+        for result in _imap(normalize, chunks, executor, window):
+            yield from result
+
+
+# Query values that cannot change in place.
+_SCALARS = frozenset((str, int, float, bool, type(None)))
+
+
+def _query_pairs(query):
+    pairs = []
+    for key, value in query.items():
+        if not isinstance(value, str):
+            value = json.dumps(value)
+        pairs.append((key, value))
+    return pairs
+
+
+def _same_items(items, query):
+    # Same keys in the same order, holding the very same values.
+    return len(items) == len(query) and all(
+        key == other and value is current
+        for (key, value), (other, current) in zip(items, query.items()))
+
+
+def _unique(values):
+    seen = set()
+    for value in values:
+        if isinstance(value, str):
+            key = value
+        else:
+            value = dict(value)
+            key = json.dumps(value, sort_keys=True, default=repr)
+        if key not in seen:
+            seen.add(key)
+            yield value
+
+
+def _imap(fun, chunks, executor=None, window=16):
+    # Like map(fun, chunks), in order. With an executor, at most `window`
+    # chunks are in flight, so inputs are only taken as results are.
+    if executor is None:
+        yield from map(fun, chunks)
+        return
+
+    pending = collections.deque()
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(fun, chunk))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _chunks(values, size):
+    values = iter(values)
+    chunk = list(itertools.islice(values, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(values, size))
+
+
+def _normalize_urls(cls, values, options):
+    # Module level so process pools can pickle it.
+    urls, expand = options
+    results = []
+    for value in values:
+        if isinstance(value, str):
+            model = cls(url=value)
+        else:
+            model = cls(**value)
+
+        models = [model]
+        hostnames = model.hostnames
+        if expand and hostnames and len(hostnames) > 1:
+            models = []
+            for hostname in hostnames:
+                endpoint = model._clone(shared=True)
+                endpoint.hostname = hostname
+                models.append(endpoint)
+
+        if urls:
+            models = [model.url for model in models]
+        results.extend(models)
+
+    return results
+
 
 class WithAws:
 
@@ -17,6 +17,33 @@ def from_keyconfig(key, config):
     return object
 
 
+def from_configs(configs, failures=None):
+    objects = Model._from_configs(configs, failures=failures)
+    return objects
+
+
+def from_keyconfigs(keyconfigs, failures=None):
+    objects = Model._from_keyconfigs(keyconfigs, failures=failures)
+    return objects
+
+
+def dump(objects, fp, attributes=None, *, compact=False, lines=False):
+    # One JSON document per line, or else a single JSON list.
+    if lines:
+        for object in objects:
+            object._dump(fp, attributes=attributes, compact=compact)
+            fp.write('\n')
+        return
+
+    separator = ',' if compact else ', '
+    fp.write('[')
+    for i, object in enumerate(objects):
+        if i:
+            fp.write(separator)
+        object._dump(fp, attributes=attributes, compact=compact)
+    fp.write(']')
+
+
 class Model(base.BaseModel, model=True):
 
     pass
@@ -1,5 +1,9 @@
+import collections.abc
+import copy
+
 from .. import utils
 from .. import props
+from . import model
 
 
 config = props.config
@@ -9,15 +13,44 @@ attribute = props.attribute
 
 class modelattribute(props.config):
 
-    def __init__(self, *args, model, collection=True, **kwds):
+    def __init__(self, *args, model, collection=True, lazy=False, **kwds):
         model = getattr(model, '_model', model)
-        kwds.update(model=model, collection=collection)
+        kwds.update(model=model, collection=collection, lazy=lazy)
         super().__init__(*args, **kwds)
 
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        value = instance.__dict__[self.name]
+        return value
+
     def __set__(self, instance, value):
         if value is None:
             return
 
+        vals = self._keyvals(value)
+        if self.lazy:
+            # Models are built on first access instead.
+            vals = lazycollection(vals, attribute=self)
+            instance.__dict__[self.name] = vals
+            return
+
+        for i, (key, val) in enumerate(vals):
+            # Replace with reified val.
+            vals[i] = self._reify(key, val)
+
+        vals = utils.namespace((val.key,val) for val in vals)
+        defaults = vals.get('_/_')
+        if defaults is not None:
+            for key, val in vals.items():
+                vals[key] = self._defaults(defaults, val)
+            # Merging in defaults could update the key.
+            vals = {val.key: val for val in vals.values()}
+
+        instance.__dict__[self.name] = vals
+
+    def _keyvals(self, value):
         try:
             value = value.items
         except AttributeError:
@@ -30,22 +63,132 @@ class modelattribute(props.config):
                 key, val = () + keyval
             except TypeError:
                 key, val = None, keyval
-            if getattr(val, 'model', False) == self.model:
-                val = val._clone()
-            elif key is None:
-                val = model.from_config(val)
+            vals[i] = key, val
+
+        return vals
+
+    def _reify(self, key, val):
+        if getattr(val, 'model', False) == self.model:
+            val = val._clone(shared=True)
+        elif key is None:
+            val = model.from_config(val)
+        else:
+            val = model.from_keyconfig(key, val)
+        return val
+
+    def _defaults(self, defaults, val):
+        if val is not defaults:
+            # Entries share what they don't override with defaults.
+            val = defaults._clone(shared=True)._merge(val)
+        return val
+
+
+class lazycollection(collections.abc.MutableMapping):
+    """Collection of models that are built on first access.
+
+    Holds the raw `(key, config)` pairs given to a `modelattribute(lazy=True)`
+    and only builds (and merges `_/_` defaults into) an entry when it is
+    looked up. Entries without a key, existing models, and the defaults are
+    built up front. Looking up a key that was not given as-is, or anything
+    that needs every key (iteration, len(), keys(), ...), builds everything
+    and from then on behaves exactly like the eager collection would.
+    """
+
+    def __init__(self, items=(), *, attribute=None):
+        # Slots are [key, config, key before defaults, model].
+        self._slots = []
+        self._index = {}
+        self._data = None
+        self._attribute = attribute
+        self._defaults = None
+        if attribute is None:
+            # Already built, eg. a copy.
+            self._data = dict(items)
+            return
+
+        for key, val in items:
+            slot = [key, val, None, None]
+            self._slots.append(slot)
+            if key is None or key == '_/_' or hasattr(val, '_clone'):
+                # Need the model to even know the key.
+                self._reify(slot)
             else:
-                val = model.from_keyconfig(key, val)
-            # Replace with reified val.
-            vals[i] = val
+                self._index[key] = slot
 
-        vals = utils.namespace((val.key,val) for val in vals)
-        defaults = vals.get('_/_')
-        if defaults is not None:
-            for key, val in vals.items():
-                clone = defaults._clone()._merge(val)
-                vals[key] = clone
-            # Merging in defaults could update the key.
-            vals = {val.key: val for val in vals.values()}
+        for slot in self._slots:
+            if slot[2] == '_/_':
+                self._defaults = slot[3]
+        for slot in self._slots:
+            if slot[3] is not None:
+                self._default(slot)
+
+    def _reify(self, slot):
+        key, val = slot[:2]
+        val = self._attribute._reify(key, val)
+        slot[1:] = None, val.key, val
+
+    def _default(self, slot):
+        val = slot[3]
+        if self._defaults is not None:
+            val = self._attribute._defaults(self._defaults, val)
+        slot[3] = val
+        self._index[val.key] = slot
+
+    def _load(self):
+        if self._data is not None:
+            return self._data
 
+        for slot in self._slots:
+            if slot[3] is None:
+                self._reify(slot)
+                self._default(slot)
+
+        # Mirror the eager collection, including key collisions.
+        vals = {}
+        for slot in self._slots:
+            vals[slot[2]] = slot[3]
+        vals = {val.key: val for val in vals.values()}
+
+        self._data = vals
+        self._slots = self._index = None
         return vals
+
+    def __getitem__(self, key):
+        if self._data is None:
+            slot = self._index.get(key)
+            if slot is not None:
+                if slot[3] is None:
+                    self._reify(slot)
+                    self._default(slot)
+                val = slot[3]
+                if val.key == key:
+                    return val
+
+        val = self._load()[key]
+        return val
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+
+    def __delitem__(self, key):
+        del self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __copy__(self):
+        clone = type(self)(self.items())
+        return clone
+
+    def __deepcopy__(self, memo):
+        clone = type(self)(copy.deepcopy(dict(self.items()), memo))
+        return clone
+
+    def __repr__(self):
+        if self._data is None:
+            pending = sum(1 for slot in self._slots if slot[3] is None)
+            return '<{} ({} pending)>'.format(type(self).__name__, pending)
+        return '{}({!r})'.format(type(self).__name__, self._data)
@@ -0,0 +1,100 @@
+import hashlib
+import io
+import pickle
+import struct
+
+from . import base
+from . import errors
+from . import props
+
+
+MAGIC = b'PYPSNAP\0'
+VERSION = 1
+# Magic, version, and the length of the pickled `(model, type)` list.
+HEADER = struct.Struct('>8sHI')
+
+
+def dump(objects, fp):
+    """Write a snapshot of `objects` (models, or anything holding models).
+
+    Models are stored as their registered `(model, type)` and finalized
+    state, after a header with a schema hash over `_attrs()` of every class
+    involved; load() rejects the snapshot once those classes change. Like
+    any pickle, only load snapshots you wrote yourself.
+    """
+    buffer = io.BytesIO()
+    pickler = _Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.dump(objects)
+
+    types = sorted(pickler.types)
+    header = pickle.dumps(types, protocol=pickle.HIGHEST_PROTOCOL)
+    fp.write(HEADER.pack(MAGIC, VERSION, len(header)))
+    fp.write(header)
+    fp.write(schema(types))
+    fp.write(buffer.getbuffer())
+
+
+def load(fp):
+    """Read a snapshot written by dump(), without running any filters."""
+    try:
+        magic, version, size = HEADER.unpack(fp.read(HEADER.size))
+    except struct.error:
+        raise errors.SnapshotError('Truncated snapshot')
+    if magic != MAGIC:
+        raise errors.SnapshotError('Not a snapshot')
+    if version != VERSION:
+        raise errors.SnapshotError('Unsupported snapshot version: {}'
+                                   .format(version))
+
+    types = pickle.loads(fp.read(size))
+    digest = fp.read(hashlib.sha256().digest_size)
+    try:
+        current = schema(types)
+    except KeyError as e:
+        raise errors.SnapshotError('Stale snapshot: {}-{} is gone'
+                                   .format(*e.args[0]))
+    if digest != current:
+        raise errors.SnapshotError('Stale snapshot: model classes changed')
+
+    objects = pickle.load(fp)
+    return objects
+
+
+def schema(types):
+    # Hash of the attributes, and defaults, of each registered model-type.
+    digest = hashlib.sha256()
+    for model, type in types:
+        cls = base.BaseModel._regcache[model, type]
+        attributes = [(name, repr(default)) for name, default in cls._attrs()]
+        digest.update(repr((model, type, attributes)).encode())
+    return digest.digest()
+
+
+def _restore(model, type):
+    # Bare instance of the registered class; state is set by _setstate().
+    cls = base.BaseModel._regcache[model, type]
+    instance = object.__new__(cls)
+    return instance
+
+
+def _setstate(object, state):
+    # Values were finalized when dumped, so skip filters and __setattr__.
+    object.__dict__.update(state)
+
+
+class _Pickler(pickle.Pickler):
+
+    def __init__(self, *args, **kwds):
+        super().__init__(*args, **kwds)
+        self.types = set()
+
+    def reducer_override(self, object):
+        if isinstance(object, base.BaseModel):
+            model, type = object._model, object._type
+            self.types.add((model, type))
+            state = object.__getstate__()
+            return (_restore, (model, type), state, None, None, _setstate)
+        if isinstance(object, props.lazycollection):
+            # Snapshots hold built graphs.
+            return dict, (dict(object.items()),)
+        return NotImplemented
@@ -1,4 +1,8 @@
+import collections.abc
+import functools
 import json
+import string
+import urllib.parse
 
 from ..utils import namespace
 from ..utils import qkey
@@ -26,18 +30,133 @@ class envnamespace(namespace):
 
         return value
 
-    def format_all(self, objects=None, escape=None):
-        for key, value in self.map.items():
+    def format_all(self, objects=None, escape=None, cache=None, deps=None):
+        # Pass a dict as `deps` to collect the `(index, attributes)` paths
+        # each key reads from `objects`.
+        objects = list(objects)
+        for key, value in self.items():
+            template = None
+            if isinstance(value, str):
+                template = envtemplate.compile(value)
+
+            if template is not None:
+                value, missing = template.render(objects, cache=cache)
+                value = self.format(value, escape=escape)
+                if deps is not None:
+                    deps[key] = template.paths
+                yield key, value, missing
+                continue
+
             wrappers = [_envformatwrapper(object, path=[i])
                         for i, object in enumerate(objects)]
 
             value = self.format(value, objects=wrappers, escape=escape)
             missing = [path for wrapper in wrappers
                             for path in wrapper.missing]
+            if deps is not None:
+                paths = ((int(path[0]), tuple(path[1:]))
+                         for wrapper in wrappers for path in wrapper.reads)
+                deps[key] = tuple(dict.fromkeys(paths))
 
             yield key, value, missing
 
 
+class envtemplate:
+    """Environment value compiled into literals and attribute lookups.
+
+    Renders exactly like formatting the value over `_envformatwrapper`
+    objects, minus the wrapper per path segment. Values using conversions,
+    format specs, indexing or names the wrapper itself defines compile to
+    None and take the wrapper path instead.
+    """
+
+    __slots__ = ('parts', 'paths')
+
+    def __init__(self, parts):
+        # Literal strings and `(index, attributes, path)` lookups.
+        self.parts = parts
+        # Distinct `(index, attributes)` paths read.
+        paths = (part[:2] for part in parts if part.__class__ is tuple)
+        self.paths = tuple(dict.fromkeys(paths))
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def compile(cls, value):
+        parts = []
+        auto = manual = False
+        for literal, field, spec, conversion in _formatter.parse(value):
+            if literal:
+                parts.append(literal)
+            if field is None:
+                continue
+            if spec or conversion or '[' in field:
+                return None
+
+            index, *attributes = field.split('.')
+            if not index:
+                # Automatic field numbering.
+                auto = True
+                index = sum(1 for part in parts if part.__class__ is tuple)
+            elif index.isdecimal():
+                manual = True
+                index = int(index)
+            else:
+                return None
+            if auto and manual:
+                return None
+            if any(not attribute or attribute in _envwrapped
+                   for attribute in attributes):
+                return None
+
+            path = '.'.join([str(index)] + attributes)
+            parts.append((index, tuple(attributes), path))
+
+        return cls(tuple(parts))
+
+    def render(self, objects, cache=None):
+        # Pass the same `cache` dict to share resolved attribute paths across
+        # renders; it's keyed by object id, so keep the objects alive with it.
+        output = []
+        missing = []
+        for part in self.parts:
+            if part.__class__ is str:
+                output.append(part)
+                continue
+
+            index, attributes, path = part
+            object = objects[index]
+            if cache is None:
+                for attribute in attributes:
+                    object = getattr(object, attribute, None)
+            else:
+                object = self._resolve(object, attributes, cache)
+            if object is None:
+                missing.append((index, path))
+                object = '{{{}}}'.format(path)
+            elif not isinstance(object, str):
+                object = json.dumps(object)
+            output.append(object)
+
+        # Wrappers report missing paths per object, in order.
+        missing.sort(key=lambda missed: missed[0])
+        missing = [path for index, path in missing]
+        return ''.join(output), missing
+
+    @staticmethod
+    def _resolve(object, attributes, cache):
+        key = id(object), attributes
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+
+        value = object
+        for attribute in attributes:
+            value = getattr(value, attribute, None)
+        cache[key] = value
+        return value
+
+
 class _envformatwrapper:
 
     def __init__(self, object, path=None, root=None, missing=None):
@@ -48,14 +167,17 @@ class _envformatwrapper:
             if missing is None:
                 missing = []
             self.missing = missing
+            self.reads = []
 
     def __getattr__(self, key):
         path = self.path + [key]
+        self.root.reads.append(path)
         object = getattr(self.object, key, None)
         wrapper = self.__class__(object, path=path, root=self.root)
         return wrapper
 
     def __str__(self):
+        self.root.reads.append(self.path)
         output = self.object
         if output is None:
            path = '.'.join(self.path)
@@ -66,6 +188,194 @@ class _envformatwrapper:
         return output
 
 
+_formatter = string.Formatter()
+# Names resolved on the wrapper itself rather than the wrapped object.
+_envwrapped = frozenset(dir(_envformatwrapper)) | {'object', 'path', 'root',
+                                                   'missing', 'reads'}
+
+
+class envtracker:
+    """Rendered environment that remembers the attribute paths each key reads.
+
+    `env` and `missing` are what WithEnviroment._env() returns. After the
+    objects change, refresh() resolves the recorded paths again and only
+    re-renders the keys reading a path that now resolves differently.
+
+    Paths through a cached pseudo-attribute, eg. `image`, also depend on the
+    attributes it is derived from (`_image_attributes`), and paths through
+    any other derived property (eg. `hostnames`) depend on anything.
+    """
+
+    def __init__(self, env, objects, escape=None):
+        self.envns = envnamespace(env or {})
+        self.objects = list(objects)
+        self.escape = escape
+        self.env = {}
+        self.missing = {}
+        # {key: paths}, {path: keys}, {path: value seen} and {path: names
+        # it depends on, or None for any}.
+        self.deps = {}
+        self.readers = {}
+        self.values = {}
+        self.names = {}
+        self._render(self.envns)
+
+    def refresh(self, changed=None):
+        # Re-render keys whose paths changed, narrowed down to paths through
+        # the `changed` attribute names if given, and return them.
+        if changed is not None:
+            changed = set(changed)
+
+        stale = set()
+        for path, keys in self.readers.items():
+            if not keys or stale.issuperset(keys):
+                continue
+            names = self.names[path]
+            if changed is not None and names is not None and (
+                    changed.isdisjoint(names)):
+                continue
+            value, seen = self._value(path), self.values[path]
+            if value is not seen and value != seen:
+                stale.update(keys)
+
+        stale = [key for key in self.envns if key in stale]
+        self._render(stale)
+        return {key: self.env[key] for key in stale}
+
+    def _render(self, keys):
+        envns = envnamespace((key, self.envns[key]) for key in keys)
+        deps = {}
+        missing = {}
+        for key, value, missed in envns.format_all(self.objects,
+                                                   escape=self.escape,
+                                                   deps=deps):
+            self.env[key] = value
+            missing[key] = missed
+
+        for key, paths in deps.items():
+            for path in self.deps.get(key, ()):
+                self.readers[path].discard(key)
+            self.deps[key] = paths
+            for path in paths:
+                self.readers.setdefault(path, set()).add(key)
+                self.values[path] = self._value(path)
+                self.names[path] = self._names(path)
+
+        missing.update((key, missed) for key, missed in self.missing.items()
+                       if key not in missing)
+        self.missing = {key: missing[key] for key in self.envns
+                        if missing.get(key)}
+
+    def _names(self, path):
+        # Attribute names whose change may change what `path` resolves to.
+        index, attributes = path
+        value = self.objects[index]
+        names = set()
+        for attribute in attributes:
+            names.add(attribute)
+            plan = getattr(value, '_plan', None)
+            if plan is not None:
+                cached = plan.names.get('_cached_attributes', frozenset())
+                stack = [attribute] if attribute in cached else []
+                while stack:
+                    # Cached pseudo-attribute, eg. image from image_*.
+                    section = '_{}_attributes'.format(stack.pop())
+                    for name in plan.names.get(section, ()):
+                        if name not in names:
+                            names.add(name)
+                            if name in cached:
+                                stack.append(name)
+                if (attribute not in cached and attribute not in plan.defaults
+                        and hasattr(type(value), attribute)):
+                    # Some other derived property, eg. hostnames.
+                    return None
+            value = getattr(value, attribute, None)
+        return frozenset(names)
+
+    def _value(self, path):
+        index, attributes = path
+        value = self.objects[index]
+        for attribute in attributes:
+            value = getattr(value, attribute, None)
+
+        if value is None or isinstance(value, str):
+            return value
+        try:
+            # Catch in-place changes to lists and such.
+            value = json.dumps(value, sort_keys=True)
+        except (TypeError, ValueError):
+            pass
+        return value
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_image(image):
+    # Split `[[registry/]project/]name[:tag|@sha256:id]` into its parts, each
+    # None if empty. Manifests repeat the same few images; hence the cache.
+    image = ((2 - image.count('/')) * '/') + image
+    registry, project, nametag = image.split('/')
+    nametag = nametag + ((1 - nametag.count(':')) * ':')
+    name, tag = nametag.split(':')
+    if name.endswith('@sha256'):
+        id = tag
+        tag = None
+        name = name[:-7]
+    else:
+        id = None
+
+    parts = (registry or None, project or None, name or None, tag or None,
+             id or None)
+    return parts
+
+
+def parse_images(images):
+    # Bulk parse_image() returning a list per part, eg. for reports.
+    columns = namespace(registry=[], project=[], name=[], tag=[], id=[])
+    appends = [column.append for column in columns.values()]
+    for image in images:
+        for append, part in zip(appends, parse_image(image)):
+            append(part)
+
+    return columns
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_url(url):
+    # The `(name, value)` pairs WithUrl.url = url sets, in order.
+    url = urllib.parse.urlsplit(url)
+    updates = tuple((name, getattr(url, name)) for name in url._fields
+                    if getattr(url, name))
+    return updates
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_netloc(netloc):
+    # The `(name, value)` pairs WithUrl.netloc = netloc sets, in order.
+    url = urllib.parse.urlsplit('//' + netloc)
+    updates = []
+    for name in ('username', 'password', 'hostname', 'port'):
+        output = getattr(url, name)
+        if output is not None:
+            if name in ('username', 'password'):
+                output = urllib.parse.unquote(output)
+            updates.append((name, output))
+    return tuple(updates)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_query(query):
+    # Query string pairs with JSON values decoded. Values are shared between
+    # callers; copy the mutable ones before handing them out.
+    pairs = []
+    for key, value in urllib.parse.parse_qsl(query):
+        try:
+            value = json.loads(value)
+        except (ValueError, TypeError):
+            pass
+        pairs.append((key, value))
+    return tuple(pairs)
+
+
 class funproperty:
 
     def __init__(self, __fun, **kwds):
@@ -120,3 +430,72 @@ class attribute(funproperty):
     def __set__(self, object, value):
         value = self.fun(object, value, **self.kwds)
         object.__dict__[self.name] = value
+
+
+class slotdict(collections.abc.MutableMapping):
+    """Mapping over a slotted object's slots, standing in for its __dict__.
+
+    Subclasses map names to slot `members` for one class. Names without a
+    slot go to the object's real `fallback` __dict__, which is only created
+    on the first write; the `created` slot records that it was.
+    """
+
+    __slots__ = ('object',)
+    members = {}
+    fallback = None
+    created = None
+
+    def __init__(self, object):
+        self.object = object
+
+    def _fallback(self, create=False):
+        cls = type(self)
+        try:
+            cls.created.__get__(self.object)
+        except AttributeError:
+            if not create:
+                return {}
+            cls.created.__set__(self.object, True)
+        fallback = cls.fallback.__get__(self.object)
+        return fallback
+
+    def __getitem__(self, name):
+        member = self.members.get(name)
+        if member is None:
+            return self._fallback()[name]
+
+        try:
+            return member.__get__(self.object)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __setitem__(self, name, value):
+        member = self.members.get(name)
+        if member is None:
+            self._fallback(create=True)[name] = value
+        else:
+            member.__set__(self.object, value)
+
+    def __delitem__(self, name):
+        member = self.members.get(name)
+        if member is None:
+            del self._fallback()[name]
+            return
+
+        try:
+            member.__delete__(self.object)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __iter__(self):
+        # Only slots; listing the fallback would mean creating it.
+        for name, member in self.members.items():
+            try:
+                member.__get__(self.object)
+            except AttributeError:
+                continue
+            yield name
+
+    def __len__(self):
+        length = sum(1 for name in self)
+        return length
@@ -1,3 +1,13 @@
+import asyncio
+import collections
+import collections.abc
+import inspect
+import threading
+import time
+import types
+import weakref
+
+
 class config:
     """Configurable property decorator.
 
@@ -9,6 +19,12 @@ class config:
         @prop
 
     Both are handled consistently.
+
+    The decorated function is called as `fun(instance, request)`, where the
+    request is a fresh marker (eg. INSTANCE.GET) carrying `.config`. Pass
+    `request='shared'` to get one preallocated marker per kind instead; the
+    function must not modify it. Pass `request=False` to call `fun(instance)`
+    on get and `fun(instance, value)` on set, without any request at all.
     """
 
     class INSTANCE:
@@ -22,9 +38,10 @@ class config:
     # Check for either.
     GET = (OWNER.GET, INSTANCE.GET)
 
-    def __init__(self, *args, name=None, **kwds):
+    def __init__(self, *args, name=None, request=True, **kwds):
         """Store decorated function config."""
         self.name = name
+        self.request = request
         for kv in kwds.items():
             # Push through property (if any) for normalization.
             setattr(self, *kv)
@@ -41,34 +58,326 @@ class config:
         """Prefer name from classdef."""
         self.name = name
 
+    @property
+    def request(self):
+        return self._request
+
+    @request.setter
+    def request(self, value):
+        if value not in (True, False, 'shared'):
+            raise ValueError('Bad request mode: {!r}'.format(value))
+        self._request = value
+        self._requests = {}
+        if value == 'shared':
+            for cls in (self.OWNER.GET, self.INSTANCE.GET):
+                request = self._requests[cls] = cls()
+                request.config = self
+
     def __get__(self, instance, owner):
+        return self._get(instance, owner)
+
+    def _get(self, instance, owner):
+        """Call the decorated function for a get."""
+        mode = self._request
+        if mode is False:
+            value = self.fun(instance)
+            return value
+
         cls = self.OWNER.GET if instance is None else self.INSTANCE.GET
-        request = cls()
-        request.config = self
+        if mode is True:
+            request = cls()
+            request.config = self
+        else:
+            request = self._requests[cls]
         value = self.fun(instance, request)
         return value
 
 
 class caching(config):
+    """Caching property decorator.
+
+    Values are cached in the instance __dict__ for good, unless a policy is
+    given: `ttl` (seconds) expires them and `maxsize` keeps only that many,
+    least recently used first. Policy caches live on the descriptor, keyed
+    by a weak reference to the instance. Pass `owner=True` to also cache
+    values computed for the class itself (eg. `C.prop`).
+
+    invalidate() drops a cached value, whichever way it is stored, and
+    invalidate_all() drops every value cached on the descriptor (policy and
+    owner caches). Values cached in instance __dict__s are only covered with
+    `track=True`, which weakly references every such instance; without it,
+    invalidate_all() on a descriptor caching in __dict__s raises TypeError.
+
+    Pass `lock=True` to compute a value once even when several threads ask
+    for it at the same time: one computes while the rest wait for its value
+    (or exception, which is never cached). Locks are striped, not global.
+    """
+
+    # Cache miss marker.
+    MISSING = object()
+    # Striped locks guarding computations in flight, for `lock=True`.
+    LOCKS = tuple(threading.Lock() for _ in range(64))
 
-    def __init__(self, *args, cache=True, **kwds):
-        super().__init__(*args, cache=cache, **kwds)
+    def __init__(self, *args, cache=True, ttl=None, maxsize=None, owner=False,
+                 clock=time.monotonic, lock=False, track=False, **kwds):
+        # {id(target): (weakref, value, expires)}, oldest first.
+        self._entries = collections.OrderedDict()
+        # {id(target): flight} for computations in progress.
+        self._flights = {}
+        super().__init__(*args, cache=cache, ttl=ttl, maxsize=maxsize,
+                         owner=owner, clock=clock, lock=lock, track=track,
+                         **kwds)
+
+    @property
+    def policy(self):
+        """True if values are cached on the descriptor."""
+        return self.ttl is not None or self.maxsize is not None
 
     def __get__(self, instance, owner):
+        if self.lock:
+            return self._cached_once(instance, owner)
+        return self._cached(instance, owner)
+
+    def _peek(self, instance, owner):
+        """Return the value cached for the instance or owner or MISSING."""
+        if instance is None:
+            if not self.owner:
+                return self.MISSING
+            return self._lookup(owner)
+        if self.policy:
+            return self._lookup(instance)
+        return instance.__dict__.get(self.name, self.MISSING)
+
+    def _cached_once(self, instance, owner):
+        """Like _cached(), but one computation per target at a time."""
+        target = owner if instance is None else instance
+        key = id(target)
+        lock = self.LOCKS[hash((id(self), key)) % len(self.LOCKS)]
+        with lock:
+            value = self._peek(instance, owner)
+            if value is not self.MISSING:
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._cached(instance, owner)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.value
+
+    def _cached(self, instance, owner):
+        """Get and cache per the returned marker (if any)."""
+        target = owner if instance is None else instance
+        stored = self.policy or instance is None
+        if stored and (instance is not None or self.owner):
+            value = self._lookup(target)
+            if value is not self.MISSING:
+                return value
+
         cache = self.cache
-        value = super().__get__(instance, owner)
-        if isinstance(value, self.GET):
+        value = self._get(instance, owner)
+        if self._request is not False and isinstance(value, self.GET):
             # Value is a marker.
             cache = getattr(value, 'cache', cache)
             value = getattr(value, 'value', value)
 
-        if instance is None:
+        if instance is None and not self.owner:
             # Nowhere to cache things.
             return value
 
         if cache:
-            # Python will stop calling us now.
-            instance.__dict__[self.name] = value
+            if stored:
+                self._store(target, value)
+            else:
+                # Python will stop calling us now.
+                instance.__dict__[self.name] = value
+                self._track(instance)
+
+        return value
+
+    def _lookup(self, target):
+        """Return the value cached for `target` or MISSING."""
+        key = id(target)
+        entry = self._entries.get(key)
+        if entry is None:
+            return self.MISSING
+
+        ref, value, expires = entry
+        if ref() is not target or (expires is not None and
+                                   expires <= self.clock()):
+            self._entries.pop(key, None)
+            return self.MISSING
+
+        if self.maxsize is not None:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                # Evicted meanwhile.
+                pass
+        return value
+
+    def _store(self, target, value):
+        """Cache `value` for `target` on the descriptor."""
+        expires = None
+        if self.ttl is not None:
+            expires = self.clock() + self.ttl
+
+        key = id(target)
+        try:
+            ref = weakref.ref(target, self._forget(key))
+        except TypeError:
+            raise TypeError('Cannot cache {} for {!r}: no weak references'
+                            .format(self.name, target)) from None
+        self._entries[key] = ref, value, expires
+        self._entries.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _track(self, instance):
+        """Remember `instance` caches in its __dict__, for invalidate_all()."""
+        if not self.track:
+            return
+        key = id(instance)
+        try:
+            ref = weakref.ref(instance, self._forget(key))
+        except TypeError:
+            # Can only be invalidated one by one.
+            return
+        self._entries[key] = ref, self.MISSING, None
+
+    def _forget(self, key):
+        # Weak reference callback dropping the entry once `key` dies.
+        entries = self._entries
+        def forget(ref):
+            entry = entries.get(key)
+            if entry is not None and entry[0] is ref:
+                del entries[key]
+        return forget
+
+    def invalidate(self, target):
+        """Drop the value cached for an instance or (owner) class."""
+        entry = self._entries.pop(id(target), None)
+        if not isinstance(target, type):
+            # Bypass any __delattr__ guards.
+            target.__dict__.pop(self.name, None)
+        return entry is not None
+
+    def invalidate_all(self):
+        """Drop every cached value on the descriptor, or tracked instance.
+
+        Values cached in instance __dict__s are not known without a policy
+        or `track=True`, so dropping them all raises TypeError.
+        """
+        if not self.policy and not self.track:
+            raise TypeError('Cannot invalidate all of {}: instance caches are'
+                            ' not tracked (pass track=True)'.format(self.name))
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for ref, value, expires in entries:
+            target = ref()
+            if value is self.MISSING and target is not None:
+                target.__dict__.pop(self.name, None)
+
+
+class _flight:
+    """Computation in progress, shared with whoever waits for it."""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class resolved:
+    """Awaitable of an already known value; awaits any number of times."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __await__(self):
+        return self.value
+        yield
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.value)
+
+
+class asyncconfig(config):
+    """Configurable property decorator for coroutine functions.
+
+    Access returns an awaitable of the value; nothing is cached.
+    """
+
+    def __get__(self, instance, owner):
+        value = self._get(instance, owner)
+        if not inspect.isawaitable(value):
+            value = resolved(value)
+        return value
+
+
+class asynccaching(caching):
+    """Caching property decorator for coroutine functions.
+
+    Access returns an awaitable. Concurrent accesses for the same target
+    share a single computation (a task on the running loop), and once done
+    the value is cached per the caching policy as a `resolved` awaitable.
+    Exceptions reach every awaiter of that computation but aren't cached.
+    """
+
+    def __get__(self, instance, owner):
+        target = owner if instance is None else instance
+        value = self._peek(instance, owner)
+        if value is not self.MISSING:
+            if isinstance(value, resolved):
+                return value
+            return resolved(value)
+
+        key = id(target)
+        flight = self._flights.get(key)
+        if flight is not None and flight[0] is target:
+            return flight[1]
+
+        task = asyncio.ensure_future(self._resolve(instance, owner))
+        self._flights[key] = target, task
+        return task
+
+    async def _resolve(self, instance, owner):
+        target = owner if instance is None else instance
+        try:
+            cache = self.cache
+            value = await self._get(instance, owner)
+            if self._request is not False and isinstance(value, self.GET):
+                # Value is a marker.
+                cache = getattr(value, 'cache', cache)
+                value = getattr(value, 'value', value)
+
+            if cache and (instance is not None or self.owner):
+                if self.policy or instance is None:
+                    self._store(target, value)
+                else:
+                    instance.__dict__[self.name] = resolved(value)
+                    self._track(instance)
+        finally:
+            self._flights.pop(id(target), None)
 
         return value
 
@@ -90,24 +399,147 @@ class attribute(caching):
         try:
             value = instance.__dict__[self.name]
         except KeyError:
-            try:
-                getter = super().__get__
-            except AttributeError:
-                value = self
+            if self.lock:
+                value = self._cached_once(instance, owner)
             else:
-                value = getter(instance, owner)
+                value = self._cached(instance, owner)
         return value
 
     def __set__(self, instance, value):
-        request = self.INSTANCE.SET()
-        request.config = self
-        request.value = value
-        value = self.fun(instance, request)
-        if value is request:
-            value = getattr(value, 'value', value)
+        if self._request is False:
+            value = self.fun(instance, value)
+        else:
+            # Always fresh; it carries the value.
+            request = self.INSTANCE.SET()
+            request.config = self
+            request.value = value
+            value = self.fun(instance, request)
+            if value is request:
+                value = getattr(value, 'value', value)
         try:
             setter = super().__set__
         except AttributeError:
             pass
         else:
             setter(instance, value)
+
+
+class asyncattribute(asynccaching):
+    """Attribute decorator for coroutine functions.
+
+    Like attribute, but the function is awaited: setting starts a task on
+    the running loop and access returns an awaitable. Once the task is done
+    its value replaces it (as a `resolved` awaitable); if it fails, it is
+    dropped so the attribute falls back to the (async) getter.
+    """
+
+    INSTANCE = attribute.INSTANCE
+    OWNER = attribute.OWNER
+    GET = attribute.GET
+    SET = attribute.SET
+
+    def __get__(self, instance, owner):
+        if instance is not None:
+            value = instance.__dict__.get(self.name, self.MISSING)
+            if value is not self.MISSING:
+                return value
+        return super().__get__(instance, owner)
+
+    def __set__(self, instance, value):
+        if self._request is not False:
+            # Always fresh; it carries the value.
+            request = self.INSTANCE.SET()
+            request.config = self
+            request.value = value
+            value = request
+        task = asyncio.ensure_future(self._assign(instance, value))
+        instance.__dict__[self.name] = task
+
+    async def _assign(self, instance, request):
+        task = asyncio.current_task()
+        try:
+            value = await self.fun(instance, request)
+        except BaseException:
+            if instance.__dict__.get(self.name) is task:
+                del instance.__dict__[self.name]
+            raise
+
+        if value is request:
+            value = getattr(value, 'value', value)
+        if instance.__dict__.get(self.name) is task:
+            instance.__dict__[self.name] = resolved(value)
+        return value
+
+
+# Async descriptor types, for gather().
+ASYNC = (asyncconfig, asynccaching)
+
+
+async def gather(*objects, return_exceptions=False):
+    """Resolve every async attribute across object graphs concurrently.
+
+    Walks `objects` and whatever they hold (public __dict__ entries, mapping
+    values and other collections' items), awaits all async descriptors found
+    on their classes in one `asyncio.gather`, and returns a list of
+    `(object, name, value)` in walk order.
+    """
+    pending = []
+    for object in _walk(objects):
+        for name in _async_names(type(object)):
+            pending.append((object, name, getattr(object, name)))
+
+    values = await asyncio.gather(*(awaitable for *_, awaitable in pending),
+                                  return_exceptions=return_exceptions)
+    results = [(object, name, value) for (object, name, _), value
+               in zip(pending, values)]
+    return results
+
+
+def _walk(objects):
+    # Depth first over an object graph, each object once.
+    seen = set()
+    stack = list(reversed(objects))
+    while stack:
+        object = stack.pop()
+        if id(object) in seen or isinstance(object, _LEAVES):
+            continue
+        seen.add(id(object))
+
+        if isinstance(object, collections.abc.Mapping):
+            children = list(object.values())
+        elif isinstance(object, (list, tuple, set, frozenset)):
+            children = list(object)
+        else:
+            yield object
+            try:
+                items = vars(object).items()
+            except TypeError:
+                continue
+            children = [value for key, value in items if key[:1] != '_']
+        stack.extend(reversed(children))
+
+
+# Never walked into.
+_LEAVES = (type(None), bool, int, float, complex, str, bytes, type,
+           types.ModuleType, types.FunctionType, types.MethodType)
+
+
+_async_names_cache = weakref.WeakKeyDictionary()
+
+
+def _async_names(cls):
+    # Names of async descriptors on `cls` (and bases), cached per class.
+    try:
+        return _async_names_cache[cls]
+    except KeyError:
+        pass
+
+    names = {}
+    for base in reversed(cls.__mro__):
+        for name, value in vars(base).items():
+            if isinstance(value, ASYNC):
+                names[name] = None
+            else:
+                names.pop(name, None)
+    names = _async_names_cache[cls] = tuple(names)
+    return names
@@ -13,3 +13,5 @@ QNAME_RE_NAME = '[0-9A-Za-z_]+'
 QNAME_RE = re.compile(f'(?:({QNAME_RE_QUALIFIER})'
                       f'({QNAME_RE_SEPARATOR}))?'
                       f'({QNAME_RE_NAME})')
+# QNAME_RE for each line, to validate many qnames in one pass.
+QNAME_RE_LINES = re.compile(f'^{QNAME_RE.pattern}$', re.MULTILINE)
@@ -1,3 +1,5 @@
+import functools
+
 from . import settings
 
 
@@ -6,36 +8,83 @@ def qkey(*qname, separator=settings.QNAME_SEPARATOR):
     return qkey
 
 
+@functools.lru_cache(maxsize=65536, typed=True)
 def qname(qkey, *, separator=settings.QNAME_SEPARATOR):
     qname = tuple(str(qkey).split(separator))
     return qname
 
 
 def qnames(qnames, *, qualifiers=settings.QUALIFIERS):
+    qualifiers = tuple(qualifiers)
     for qname in qnames:
-        try:
-            q, _, name = settings.QNAME_RE.fullmatch(qname).groups()
-        except AttributeError:
-            raise ValueError(f'Bad qname: {qname}')
+        yield from _qname_pairs(qname, qualifiers)
+
+
+def qnames_batch(qnames, *, qualifiers=settings.QUALIFIERS):
+    # Like qnames(), but validates the whole list in one regex pass and
+    # returns a list; raises for the first bad qname before yielding any.
+    qnames = list(qnames)
+    qualifiers = tuple(qualifiers)
+    text = '\n'.join(qnames)
+    matches = list(settings.QNAME_RE_LINES.finditer(text))
+    if len(matches) != len(qnames) or text.count('\n') != len(qnames) - 1:
+        for qname in qnames:
+            if not settings.QNAME_RE.fullmatch(qname):
+                raise ValueError(f'Bad qname: {qname}')
 
+    pairs = []
+    for match in matches:
+        q, _, name = match.groups()
         quals = [qualifier(q, qualifiers=qualifiers)] if q else qualifiers
         if None in quals:
-            raise ValueError(f'Bad qname: {qname}')
+            raise ValueError(f'Bad qname: {match.group()}')
+        pairs.extend((q, name) for q in quals)
+    return pairs
+
+
+@functools.lru_cache(maxsize=65536)
+def _qname_pairs(qname, qualifiers):
+    try:
+        q, _, name = settings.QNAME_RE.fullmatch(qname).groups()
+    except (AttributeError, TypeError):
+        raise ValueError(f'Bad qname: {qname}')
 
-        for q in quals:
-            yield q, name
+    quals = [qualifier(q, qualifiers=qualifiers)] if q else qualifiers
+    if None in quals:
+        raise ValueError(f'Bad qname: {qname}')
+
+    pairs = tuple((q, name) for q in quals)
+    return pairs
 
 
 def qualifier(q, *, qualifiers=settings.QUALIFIERS):
     if not q:
         return
 
-    if q in qualifiers:
-        return q
+    qualifier = _qualifier_prefixes(tuple(qualifiers)).get(q)
+    if qualifier is _AMBIGUOUS:
+        raise ValueError(f'Ambiguous qualifier: {q}')
+    return qualifier
+
+
+# Prefix shared by several qualifiers.
+_AMBIGUOUS = object()
 
+
+@functools.lru_cache(maxsize=None)
+def _qualifier_prefixes(qualifiers):
+    # Flattened prefix trie: {prefix: qualifier} for every prefix of every
+    # qualifier, where exact names win and shared prefixes are ambiguous.
+    prefixes = {}
+    for qualifier in qualifiers:
+        for i in range(1, len(qualifier) + 1):
+            prefix = qualifier[:i]
+            seen = prefixes.setdefault(prefix, qualifier)
+            if seen != qualifier:
+                prefixes[prefix] = _AMBIGUOUS
     for qualifier in qualifiers:
-        if qualifier.startswith(q):
-            return qualifier
+        prefixes[qualifier] = qualifier
+    return prefixes
 
 
 class namespace(dict):
@@ -1,7 +1,12 @@
-
 import pytest
 
 
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'benchmark: timing/allocation checks, deselect with '
+                   '`-m "not benchmark"`')
+
+
 @pytest.fixture(scope='session')
 def props():
     from pyproject import props
@@ -0,0 +1,57 @@
+import pytest
+
+
+@pytest.fixture(scope='module')
+def IndexModel(Model):
+    from pyproject.models.mixins import WithUrl
+    from pyproject.models.props import modelattribute
+    class IndexModel(WithUrl, Model, model=True):
+        _attributes = [('children', None)]
+        children = modelattribute(model='index_model')
+    class Svc(IndexModel):
+        pass
+    return IndexModel
+
+
+def test_index(IndexModel):
+    from pyproject.models.index import Index
+    children = {'svc/{}'.format(i): {'model': 'index_model',
+                                     'url': '//host{}.b'.format(i % 3)}
+                for i in range(6)}
+    root = IndexModel(type='svc', name='root', url='//root.a',
+                      children=children)
+    index = Index([root], attributes=['hostname'], ordered=['hostname'])
+    assert len(index) == 7 and root in index
+
+    one = root.children['svc/1']
+    assert index.lookup('index_model', 'svc', 1) == [one]
+    assert len(index.lookup(type='svc')) == 7
+    assert [m.name for m in index.find(hostname='host1.b')] == [1, 4]
+    with pytest.raises(ValueError):
+        index.find(port=1)
+
+    hostnames = [m.hostname for m in index.range('hostname', 'host1', 'i')]
+    assert hostnames == ['host1.b', 'host1.b', 'host2.b', 'host2.b']
+    assert index.prefix('hostname', 'root') == [root]
+    assert len(index.prefix('hostname', 'host')) == 6
+
+    # Changes, however they happen, are reflected.
+    one.url = '//moved.c'
+    one.name = 'renamed'
+    assert index.find(hostname='host1.b') == [root.children['svc/4']]
+    assert index.find(hostname='moved.c') == [one]
+    assert index.lookup('index_model', 'svc', 'renamed') == [one]
+    assert index.lookup('index_model', 'svc', 1) == []
+    # Partial lookups intersect an index per part.
+    assert index.lookup(name='renamed') == [one]
+    assert index.lookup(name=1) == []
+    assert index.lookup('index_model', name='root') == [root]
+    assert len(index.lookup()) == 7
+    assert 1 not in index.parts[2] and len(index.parts[1]['svc']) == 7
+    assert index.prefix('hostname', 'mo') == [one]
+
+    index.remove(root, nested=False)
+    assert root not in index and root.__dict__['_indexes'] is None
+    root.url = '//elsewhere'
+    assert index.prefix('hostname', 'e') == []
+    assert '_indexes' not in root._clone().__dict__
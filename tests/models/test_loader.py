@@ -0,0 +1,168 @@
+import concurrent.futures
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def LoaderModel(Model):
+    class LoaderModel(Model, model=True):
+        _attributes = [('port', None), ('tags', None)]
+    class Svc(LoaderModel):
+        pass
+    return LoaderModel
+
+
+def write(root, relpath, config):
+    path = os.path.join(root, 'config', 'model', relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as fp:
+        json.dump(config, fp)
+    return path
+
+
+def test_loader(LoaderModel, tmp_path):
+    from pyproject.models import loader
+    base, overlay = str(tmp_path / 'base'), str(tmp_path / 'overlay')
+    write(base, '_/_.json', {'model': 'loader_model', 'port': 80})
+    write(base, 'svc/web.json', {'model': 'loader_model', 'tags': ['a']})
+    write(base, 'svc/db.json', {'model': 'loader_model', 'port': 5432})
+    write(overlay, 'svc/web.json', {'model': 'loader_model', 'port': 8080})
+    write(base, 'svc/.hidden.json', {})
+    write(base, 'svc/notes.txt', {})
+
+    load = loader.Loader([base, overlay], cls=LoaderModel)
+    found = load.discover()
+    assert sorted(found['model']) == ['_/_', 'svc/db', 'svc/web']
+    models = load.load()['model']
+    web, db = models['svc/web'], models['svc/db']
+    assert (web.key, web.port, web.tags) == ('svc/web', 8080, ['a'])
+    assert (db.key, db.port, db.tags) == ('svc/db', 5432, None)
+    assert models['_/_'].port == 80
+    assert len(load.sources['model']['svc/web']) == 3
+
+    failures = []
+    write(base, 'svc/bad.json', {'model': 'loader_model', 'nope': 1})
+    models = load.load(failures=failures)['model']
+    assert 'svc/bad' not in models
+    assert [key for key, e in failures] == ['svc/bad']
+
+    # Files that fail to parse only fail the keys built from them.
+    broken = os.path.join(overlay, 'config', 'model', 'svc', 'db.json')
+    with open(broken, 'w') as fp:
+        fp.write('{bad')
+    failures = []
+    models = load.load(failures=failures)['model']
+    assert sorted(models) == ['_/_', 'svc/web']
+    assert [key for key, e in failures] == ['svc/bad', 'svc/db']
+    assert isinstance(failures[1][1], json.JSONDecodeError)
+    assert list(load.errors) == [broken]
+    os.remove(os.path.join(base, 'config', 'model', 'svc', 'bad.json'))
+    with pytest.raises(json.JSONDecodeError):
+        load.load()
+
+
+def test_loader_cache(LoaderModel, tmp_path, monkeypatch):
+    from pyproject.models import loader
+    root, cache = str(tmp_path), str(tmp_path / 'cache.pickle')
+    paths = [write(root, 'svc/s{}.json'.format(i),
+                   {'model': 'loader_model', 'port': i}) for i in range(20)]
+
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        cold = loader.load([root], cls=LoaderModel, executor=executor,
+                           cache=cache)
+    assert os.path.exists(cache)
+
+    parsed = []
+    def parse(path):
+        parsed.append(path)
+        return loader._parse_json(path)
+    monkeypatch.setitem(loader.PARSERS, '.json', parse)
+    warm = loader.load([root], cls=LoaderModel, cache=cache)
+    assert parsed == []
+    assert ({k: v.port for k, v in warm['model'].items()} ==
+            {k: v.port for k, v in cold['model'].items()})
+
+    write(root, 'svc/s3.json', {'model': 'loader_model', 'port': 33})
+    os.utime(paths[3], ns=(0, 0))
+    warm = loader.load([root], cls=LoaderModel, cache=cache)
+    assert parsed == [paths[3]]
+    assert warm['model']['svc/s3'].port == 33
+
+
+def test_loader_reload(LoaderModel, tmp_path, monkeypatch):
+    from pyproject.models import loader
+    root = str(tmp_path)
+    defaults = write(root, '_/_.json', {'model': 'loader_model', 'port': 1})
+    paths = [write(root, 'svc/s{}.json'.format(i), {'model': 'loader_model'})
+             for i in range(5)]
+    load = loader.Loader([root], cls=LoaderModel)
+    models = load.load()['model']
+    assert load.reload() == {}
+    s0, s1 = models['svc/s0'], models['svc/s1']
+
+    parsed = []
+    def parse(path):
+        parsed.append(path)
+        return loader._parse_json(path)
+    monkeypatch.setitem(loader.PARSERS, '.json', parse)
+
+    write(root, 'svc/s1.json', {'model': 'loader_model', 'port': 11})
+    os.utime(paths[1], ns=(0, 0))
+    assert load.reload() == {'model': {'svc/s1'}}
+    assert parsed == [paths[1]]
+    assert models['svc/s0'] is s0
+    assert models['svc/s1'] is not s1 and models['svc/s1'].port == 11
+
+    # Defaults affect everything built from them.
+    write(root, '_/_.json', {'model': 'loader_model', 'port': 2})
+    os.utime(defaults, ns=(0, 0))
+    rebuilt = load.reload()['model']
+    assert rebuilt == {'_/_'} | {'svc/s{}'.format(i) for i in range(5)}
+    assert models['svc/s0'].port == 2 and models['svc/s1'].port == 11
+
+    os.remove(paths[4])
+    write(root, 'svc/s5.json', {'model': 'loader_model'})
+    assert load.reload() == {'model': {'svc/s4', 'svc/s5'}}
+    assert 'svc/s4' not in models and models['svc/s5'].port == 2
+
+    write(root, 'svc/s0.json', {'model': 'loader_model', 'port': 3})
+    os.utime(paths[0], ns=(0, 0))
+    watch = load.watch(interval=0)
+    assert next(watch) == {'model': {'svc/s0'}}
+
+def test_loader_reload_broken(LoaderModel, tmp_path):
+    from pyproject.models import loader
+    root = str(tmp_path)
+    paths = [write(root, 'svc/s{}.json'.format(i),
+                   {'model': 'loader_model', 'port': i}) for i in range(2)]
+    load = loader.Loader([root], cls=LoaderModel)
+    models = load.load()['model']
+    s1 = models['svc/s1']
+
+    # Caught mid-write: the last good model stays, reported once.
+    with open(paths[1], 'w') as fp:
+        fp.write('{"model": ')
+    os.utime(paths[1], ns=(1, 1))
+    failures = []
+    assert load.reload(failures=failures) == {}
+    assert [key for key, e in failures] == ['svc/s1']
+    assert models['svc/s1'] is s1 and s1.port == 1
+    assert load.reload(failures=failures) == {}
+    assert len(failures) == 1
+    with pytest.raises(json.JSONDecodeError):
+        os.utime(paths[1], ns=(2, 2))
+        load.reload()
+    assert models['svc/s1'] is s1
+
+    # Retried once it changes again, and watch() keeps going meanwhile.
+    watch = load.watch(interval=0)
+    write(root, 'svc/s0.json', {'model': 'loader_model', 'port': 10})
+    os.utime(paths[0], ns=(3, 3))
+    assert next(watch) == {'model': {'svc/s0'}}
+    assert models['svc/s0'].port == 10 and models['svc/s1'] is s1
+    write(root, 'svc/s1.json', {'model': 'loader_model', 'port': 11})
+    os.utime(paths[1], ns=(4, 4))
+    assert next(watch) == {'model': {'svc/s1'}}
+    assert models['svc/s1'].port == 11 and load.errors == {}
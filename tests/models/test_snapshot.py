@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def SnapModel(Model):
+    from pyproject.models.mixins import WithUrl
+    from pyproject.models.props import modelattribute
+    class SnapModel(WithUrl, Model, model=True):
+        _attributes = [('children', None), ('port', None)]
+        children = modelattribute(model='snap_model')
+    class Svc(SnapModel):
+        pass
+    return SnapModel
+
+
+def test_snapshot(SnapModel):
+    from pyproject.models import errors
+    from pyproject.models import snapshot
+    children = {'svc/{}'.format(i): {'model': 'snap_model', 'port': i}
+                for i in range(3)}
+    root = SnapModel(type='svc', name='root', url='http://h/p?x=1',
+                     children=children)
+    clone = root._clone(shared=True)
+    fp = io.BytesIO()
+    snapshot.dump({'root': root, 'clone': clone}, fp)
+
+    fp.seek(0)
+    loaded = snapshot.load(fp)
+    root2, clone2 = loaded['root'], loaded['clone']
+    assert root2.__class__ is root.__class__
+    assert root2._config() == root._config()
+    assert root2.url == 'http://h/p?x=1' and root2.key == 'svc/root'
+    assert root2.children['svc/1'].port == 1
+    # Sharing survives, and so does copy-on-write.
+    assert clone2.children._source is root2.children._source
+    overlay = SnapModel(type='svc', name='root', children={
+        'svc/1': {'model': 'snap_model', 'port': 9}})
+    clone2._merge(overlay)
+    assert clone2.children['svc/1'].port == 9
+    assert root2.children['svc/1'].port == 1
+
+    # Filters are bypassed while loading.
+    filters = []
+    type(root).port = property(lambda self: self.__dict__['port'],
+                               lambda self, value: filters.append(value))
+    try:
+        fp.seek(0)
+        snapshot.load(fp)
+        assert filters == []
+    finally:
+        del type(root).port
+
+    # Changing a class definition makes snapshots stale.
+    attributes = type(root)._attributes
+    type(root)._attributes = attributes + [('extra', None)]
+    type(root)._compile()
+    try:
+        fp.seek(0)
+        with pytest.raises(errors.SnapshotError):
+            snapshot.load(fp)
+    finally:
+        type(root)._attributes = attributes
+        type(root)._compile()
+    fp.seek(0)
+    snapshot.load(fp)
+
+    with pytest.raises(errors.SnapshotError):
+        snapshot.load(io.BytesIO(b'nope'))
@@ -86,3 +86,261 @@ def test_caching(props):
     c.cache_on
     assert c.called == 1
     C.called = 0
+
+
+def test_request_modes(props):
+    created = []
+    class counting(props.attribute):
+        class INSTANCE(props.attribute.INSTANCE):
+            class GET(props.attribute.INSTANCE.GET):
+                def __init__(self):
+                    created.append(self)
+            class SET(props.attribute.INSTANCE.SET):
+                def __init__(self):
+                    created.append(self)
+        GET = (props.attribute.OWNER.GET, INSTANCE.GET)
+    class C:
+        @counting(cache=False)
+        def fresh(instance, context):
+            return context
+        @counting(cache=False, request='shared')
+        def shared(instance, context):
+            return context.__class__
+        @counting(cache=False, request=False)
+        def direct(instance, *value):
+            return value
+
+    # Shared requests are preallocated.
+    assert len(created) == 1
+    del created[:]
+
+    c = C()
+    assert c.fresh is not c.fresh
+    assert len(created) == 2
+    del created[:]
+
+    assert c.shared is counting.INSTANCE.GET
+    assert c.shared is counting.INSTANCE.GET
+    assert len(created) == 0
+
+    assert c.direct == ()
+    c.direct = 1
+    c.fresh = 1
+    assert len(created) == 1
+
+    with pytest.raises(ValueError):
+        props.config(request='nope')
+
+
+@pytest.mark.benchmark
+def test_request_benchmark(props):
+    import timeit
+    import tracemalloc
+    class C:
+        @props.caching(cache=False)
+        def fresh(instance, context):
+            return context
+        @props.caching(cache=False, request='shared')
+        def shared(instance, context):
+            return context
+        @props.caching(cache=False, request=False)
+        def direct(instance):
+            return instance
+
+    def allocated(name, n=1000):
+        # Bytes allocated per get, keeping whatever each get returned alive.
+        c = C()
+        values = [None] * n
+        tracemalloc.start()
+        try:
+            for i in range(n):
+                values[i] = getattr(c, name)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return current / n
+
+    assert allocated('fresh') > 64
+    assert allocated('shared') < 1
+    assert allocated('direct') < 1
+
+    c = C()
+    fresh = min(timeit.repeat(lambda: c.fresh, number=10000, repeat=5))
+    direct = min(timeit.repeat(lambda: c.direct, number=10000, repeat=5))
+    assert direct < fresh
+
+
+def test_caching_policies(props):
+    now = [0]
+    clock = lambda: now[0]
+    class C:
+        called = 0
+        @props.caching(ttl=10, clock=clock)
+        def ttl(instance, context):
+            C.called += 1
+            return C.called
+        @props.caching(maxsize=2)
+        def lru(instance, context):
+            C.called += 1
+            return C.called
+        @props.caching(owner=True, track=True)
+        def owned(instance, context):
+            C.called += 1
+            return C.called
+        @props.caching()
+        def plain(instance, context):
+            return C.called
+
+    c = C()
+    assert c.ttl == c.ttl == 1
+    assert 'ttl' not in c.__dict__
+    now[0] = 10
+    assert c.ttl == c.ttl == 2
+
+    a, b, d = C(), C(), C()
+    assert (a.lru, b.lru, a.lru) == (3, 4, 3)
+    # Evicts b, the least recently used.
+    assert (d.lru, a.lru, b.lru) == (5, 3, 6)
+    lru = C.__dict__['lru']
+    assert len(lru._entries) == 2
+    del a, b, d
+    assert len(lru._entries) == 0
+
+    assert C.owned == C.owned == 7
+    assert c.owned == c.owned == 8
+    assert c.__dict__['owned'] == 8
+
+    owned = C.__dict__['owned']
+    assert owned.invalidate(C)
+    assert C.owned == 9
+    owned.invalidate_all()
+    assert 'owned' not in c.__dict__
+    assert (C.owned, c.owned) == (10, 11)
+    owned.invalidate(c)
+    assert c.owned == 12
+    # Only tracked instances are remembered, so untracked ones cannot all go.
+    assert c.plain == 12
+    assert len(C.__dict__['plain']._entries) == 0
+    with pytest.raises(TypeError):
+        C.__dict__['plain'].invalidate_all()
+    assert c.__dict__['plain'] == 12
+    C.__dict__['ttl'].invalidate(c)
+    assert c.ttl == 13
+
+
+@pytest.mark.parametrize('kind', ['caching', 'attribute'])
+def test_caching_lock(props, kind):
+    import threading
+    import time
+    class C:
+        called = 0
+        @getattr(props, kind)(lock=True)
+        def slow(instance, context):
+            C.called += 1
+            time.sleep(0.05)
+            if C.called == 1:
+                raise ValueError('flaky')
+            return C.called
+
+    def get(c, results, barrier):
+        barrier.wait()
+        try:
+            results.append(c.slow)
+        except ValueError as e:
+            results.append(e)
+
+    c = C()
+    for expect in (ValueError, 2):
+        results = []
+        barrier = threading.Barrier(8)
+        threads = [threading.Thread(target=get, args=(c, results, barrier))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # One computation, shared by all; the failure was not cached.
+        if expect is ValueError:
+            assert all(isinstance(r, ValueError) for r in results)
+        else:
+            assert results == [2] * 8
+    assert C.called == 2
+    assert c.slow == 2
+    assert not C.__dict__['slow']._flights
+
+
+def test_async_caching(props):
+    import asyncio
+    class C:
+        called = 0
+        @props.asynccaching
+        async def remote(instance, context):
+            C.called += 1
+            await asyncio.sleep(0.01)
+            if C.called == 1:
+                raise ValueError('flaky')
+            return C.called
+
+    async def main():
+        c = C()
+        results = await asyncio.gather(c.remote, c.remote,
+                                       return_exceptions=True)
+        assert [type(r) for r in results] == [ValueError, ValueError]
+        assert await asyncio.gather(c.remote, c.remote) == [2, 2]
+        assert isinstance(c.__dict__['remote'], props.resolved)
+        assert await c.remote == 2
+        assert C.called == 2
+
+    asyncio.run(main())
+
+
+def test_async_descriptors(props):
+    import asyncio
+    lookups = []
+    async def resolver(name):
+        # Stand-in for DNS, registries, ...
+        lookups.append(name)
+        await asyncio.sleep(0.01)
+        return name.upper()
+
+    class Image:
+        def __init__(self, name):
+            self.name = name
+        @props.asynccaching
+        async def digest(instance, context):
+            return await resolver(instance.name)
+        @props.asyncconfig
+        async def fresh(instance, context):
+            return await resolver('fresh')
+        @props.asyncattribute
+        async def host(instance, context):
+            if isinstance(context, props.attribute.SET):
+                return await resolver(context.value)
+            return 'default'
+
+    class Service:
+        def __init__(self, images):
+            self.images = images
+            self._private = Image('hidden')
+
+    async def main():
+        image = Image('one')
+        assert await image.host == 'default'
+        image.host = 'h'
+        assert await image.host == 'H'
+        assert isinstance(image.__dict__['host'], props.resolved)
+
+        graph = [Service({'a': image, 'b': Image('two')}), image]
+        results = await props.gather(graph)
+        assert [(o.name, n, v) for o, n, v in results] == [
+            ('one', 'digest', 'ONE'), ('one', 'fresh', 'FRESH'),
+            ('one', 'host', 'H'),
+            ('two', 'digest', 'TWO'), ('two', 'fresh', 'FRESH'),
+            ('two', 'host', 'default')]
+        assert sorted(lookups) == ['fresh', 'fresh', 'h', 'one', 'two']
+        # Cached results, not coroutines.
+        assert isinstance(image.__dict__['digest'], props.resolved)
+        await props.gather(graph)
+        assert len(lookups) == 7
+
+    asyncio.run(main())
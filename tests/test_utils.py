@@ -0,0 +1,34 @@
+import pytest
+
+
+def test_qualifier():
+    from pyproject import utils
+    qualifiers = ('model', 'module', 'mod', 'service')
+    assert utils.qualifier('', qualifiers=qualifiers) is None
+    assert utils.qualifier('s', qualifiers=qualifiers) == 'service'
+    assert utils.qualifier('mode', qualifiers=qualifiers) == 'model'
+    assert utils.qualifier('mod', qualifiers=qualifiers) == 'mod'
+    assert utils.qualifier('nope', qualifiers=qualifiers) is None
+    with pytest.raises(ValueError):
+        utils.qualifier('mo', qualifiers=qualifiers)
+
+
+def test_qnames():
+    from pyproject import utils
+    qualifiers = ('model', 'service')
+    names = ['m/one', 'two', 'service/three', '/four']
+    expect = [('model', 'one'), ('model', 'two'), ('service', 'two'),
+              ('service', 'three'), ('model', 'four'), ('service', 'four')]
+    assert list(utils.qnames(names, qualifiers=qualifiers)) == expect
+    assert utils.qnames_batch(names, qualifiers=qualifiers) == expect
+    assert utils.qnames_batch([]) == []
+
+    for bad in (['one', 'a/b/c'], ['one\ntwo'], ['x/one'], ['']):
+        with pytest.raises(ValueError):
+            list(utils.qnames(bad, qualifiers=qualifiers))
+        with pytest.raises(ValueError):
+            utils.qnames_batch(bad, qualifiers=qualifiers)
+
+    assert utils.qname('a/b') == ('a', 'b')
+    assert utils.qname(1) == ('1',)
+    assert utils.qname(True) == ('True',)